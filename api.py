@@ -0,0 +1,512 @@
+"""HTTP JSON API exposing the solver without the Streamlit interface.
+
+Usage: python api.py [--host 127.0.0.1] [--port 8600] [--workers 2] [--timeout 60]
+
+Endpoints (JSON bodies, JSON responses):
+    POST /parse     {"equation": "f'(x) = f(x)"}
+    POST /solve     {"equation": "...", "ics": [{"x0": 0, "y0": 1}, ...], "series_order": 10}
+                    (series_order is optional, it asks for a power series approximation)
+                    or {"equations": ["...", "..."], "functions": ["f", "g"]}
+    POST /evaluate  {"expression": "C1*exp(x)", "range": [-5, 5], "points": 1000, "constants": {"C1": 1}}
+                    returns x, y and log10_abs (log10 |y|, defined even where y overflows)
+    GET  /metrics   request counts and latencies per endpoint, resource limits hits (see limits.py),
+                    workers restarted after a timeout or a crash
+    GET  /health
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import queue
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import limits
+
+# Workers are spawned rather than forked, like solve jobs (see jobs.py)
+_mp_context = multiprocessing.get_context("spawn")
+
+MAX_BODY_SIZE = 1_000_000
+MAX_EVALUATION_POINTS = 100_000
+
+# Endpoints counted separately in /metrics, the others are counted together
+ENDPOINTS = {"GET": ("/health", "/metrics"), "POST": ("/parse", "/solve", "/evaluate")}
+
+
+# Worker side: these functions run in the pool processes and return (payload, error) tuples
+
+
+def _warm_worker():
+    """Imports sympy and the solver once per worker process."""
+    import calc  # noqa: F401
+    import numpy  # noqa: F401
+
+    limits.apply_memory_limit()
+
+
+def _worker_loop(conn):
+    """Entry point of a pool process, runs the (func, args) received on conn until it is closed."""
+    _warm_worker()
+    conn.send("ready")
+    while True:
+        try:
+            func, args = conn.recv()
+        except EOFError:
+            break
+        try:
+            reply = (func(*args), None)
+        except Exception as e:
+            reply = (None, f"{type(e).__name__}: {e}")
+        conn.send(reply)
+
+
+def _run_task(task, *args):
+    """Run a task, returns its (payload, error) tuple and the limits it hit in this worker."""
+    limits.limit_hits.clear()
+    try:
+        result = task(*args)
+    except limits.ResourceLimitError as e:
+        result = (None, str(e))
+    except MemoryError:
+        limits.record_limit_hit("memory")
+        result = (None, limits.MEMORY_ERROR_MESSAGE)
+    return result, limits.limit_hits_snapshot()
+
+
+def _ping():
+    return True
+
+
+def _parse_task(equation):
+    import sympy
+    from calc import parse_ode
+
+    ode_eq, ode_order, error = parse_ode(equation)
+    if error:
+        return None, error
+    limits.check_expression_size(ode_eq)
+    return {"equation": str(ode_eq), "latex": sympy.latex(ode_eq), "order": int(ode_order)}, ""
+
+
+def _solution_payload(solution):
+    import sympy
+
+    limits.check_expression_size(solution)
+    return {"equation": str(solution), "rhs": str(solution.rhs), "latex": sympy.latex(solution)}
+
+
+def _solve_task(equation, ics, series_order=None):
+    from calc import parse_ode, prepare_ics_dict, solve_ode
+    from series import solve_ode_series
+
+    ode_eq, ode_order, error = parse_ode(equation)
+    if error:
+        return None, error
+    if ode_order == 0:
+        return None, "L'équation ne contient pas de dérivée de f."
+
+    ics_values = {i: vals for i, vals in enumerate(ics or [])}
+    ics_dict = prepare_ics_dict(bool(ics_values), ics_values)
+    if series_order is not None:
+        series_solution, error = solve_ode_series(ode_eq, ics_dict, series_order)
+        solution = series_solution.equation if series_solution is not None else None
+    else:
+        solution, error = solve_ode(ode_eq, ics_dict)
+    if error:
+        return None, error
+
+    solutions = solution if isinstance(solution, list) else [solution]
+    return {"solutions": [_solution_payload(sol) for sol in solutions]}, ""
+
+
+def _solve_system_task(equations, function_names):
+    from sympy.core.function import AppliedUndef, UndefinedFunction
+
+    from calc import local_dict, parse_ode, solve_ode_system, x_sym
+
+    limits.check_system_size(len(equations))
+
+    system_eqs = []
+    for eq_str in equations:
+        eq, _, error = parse_ode(eq_str)
+        if error:
+            return None, f"Erreur dans l'équation {eq_str} : {error}"
+        system_eqs.append(eq)
+
+    if function_names:
+        if not all(isinstance(local_dict.get(name), UndefinedFunction) for name in function_names):
+            return None, "Fonction inconnue dans la liste des fonctions."
+        func_list = [local_dict[name](x_sym) for name in function_names]
+    else:
+        func_list = sorted(set().union(*(eq.atoms(AppliedUndef) for eq in system_eqs)), key=str)
+
+    solution, error = solve_ode_system(system_eqs, func_list)
+    if error:
+        return None, error
+
+    return {"solutions": [[_solution_payload(sol) for sol in sol_set] for sol_set in solution]}, ""
+
+
+def _evaluate_task(expression, x_range, num_points, constants_values):
+    import numpy as np
+    import sympy
+
+    from calc import local_dict, x_sym
+    from evaluator import evaluate_expression
+    from ode_parser import ParseError, parse_ode_string
+
+    # Constants are single symbols, where the parser would read C1 as C*1
+    constant_names = set(re.findall(r"\bC\d+\b", expression)) | set(constants_values or {})
+    namespace = {**local_dict, **{name: sympy.Symbol(name) for name in constant_names}}
+    try:
+        expr = parse_ode_string(expression, namespace)
+    except ParseError as e:
+        return None, f"Expression invalide à la position {e.position + 1} ({e.message})"
+    except limits.ResourceLimitError:
+        raise
+    except Exception as e:
+        return None, f"Expression invalide ({e})"
+    if not isinstance(expr, sympy.Expr):
+        return None, "L'expression doit être une expression numérique de x, pas une équation ou une liste."
+
+    expr = expr.subs({sympy.Symbol(name): value for name, value in (constants_values or {}).items()})
+    unresolved_constants = sorted(str(s) for s in expr.free_symbols if s != x_sym)
+    if unresolved_constants:
+        return None, f"Les constantes doivent être précisées : {', '.join(unresolved_constants)}"
+
+    limits.check_expression_size(expr)
+    x_vals = np.linspace(x_range[0], x_range[1], num_points)
+    evaluation = evaluate_expression(expr, x_sym, x_vals)
+
+    # Undefined, non-real and overflowing values are reported as null, log10_abs still covers the latter
+    y_list = [float(y) if math.isfinite(y) else None for y in evaluation.values]
+    log10_abs = [float(v) if math.isfinite(v) else None for v in evaluation.log10_abs]
+    return {"x": x_vals.tolist(), "y": y_list, "log10_abs": log10_abs}, ""
+
+
+# Server side
+
+
+class BadRequest(Exception):
+    pass
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+class _Worker:
+    """Pool process running one task at a time, killed when a task overruns."""
+
+    # Time left to a new process to import sympy, not counted in the task timeout
+    STARTUP_TIMEOUT = 120
+
+    def __init__(self):
+        self.ready = False
+        self._conn, child_conn = _mp_context.Pipe()
+        self._process = _mp_context.Process(target=_worker_loop, args=(child_conn,), daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    def call(self, func, args, timeout):
+        """Run func(*args) in the process, raises TimeoutError after timeout seconds."""
+        try:
+            if not self.ready:
+                if not self._conn.poll(self.STARTUP_TIMEOUT):
+                    raise WorkerCrashed("startup")
+                self._conn.recv()
+                self.ready = True
+            self._conn.send((func, args))
+            finished = self._conn.poll(timeout)
+            if finished:
+                result, error = self._conn.recv()
+        except (EOFError, OSError):
+            raise WorkerCrashed()
+        if not finished:
+            raise TimeoutError()
+        if error:
+            raise RuntimeError(error)
+        return result
+
+    def kill(self):
+        self._process.terminate()
+        self._process.join(timeout=1)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._conn.close()
+
+
+class LatencyMetrics:
+    """Per-endpoint request counts and latencies, shared by the handler threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, status, duration):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                "count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0,
+            })
+            duration_ms = duration * 1000
+            stats["count"] += 1
+            stats["errors"] += status >= 400
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["last_ms"] = duration_ms
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: {**stats, "mean_ms": stats["total_ms"] / stats["count"]}
+                for endpoint, stats in self._endpoints.items()
+            }
+
+
+class SolverService:
+    """Pool of pre-warmed worker processes running the solver tasks.
+
+    A task that overruns the timeout can't be interrupted inside sympy, so its
+    worker is killed and replaced by a new process.
+    """
+
+    def __init__(self, workers=2, timeout=60):
+        self.workers = workers
+        self.timeout = timeout
+        self.metrics = LatencyMetrics()
+        self.restarted_workers = 0
+        self._lock = threading.Lock()
+        self._all_workers = set()
+        self._idle_workers = queue.Queue()
+        for _ in range(workers):
+            self._idle_workers.put(self._start_worker())
+
+    def _start_worker(self):
+        worker = _Worker()
+        with self._lock:
+            self._all_workers.add(worker)
+        return worker
+
+    def _replace_worker(self, worker):
+        worker.kill()
+        with self._lock:
+            self._all_workers.discard(worker)
+            self.restarted_workers += 1
+        self._idle_workers.put(self._start_worker())
+
+    def warm_up(self):
+        """Wait until every worker process is ready, so the first requests don't pay for sympy's import."""
+        workers = [self._idle_workers.get() for _ in range(self.workers)]
+        for worker in workers:
+            worker.call(_ping, (), self.timeout)
+            self._idle_workers.put(worker)
+
+    def run(self, task, *args):
+        """Run task in the pool, returns its (payload, error) tuple."""
+        started_at = time.monotonic()
+        try:
+            worker = self._idle_workers.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Aucun processus de résolution disponible après {self.timeout} s.")
+
+        remaining = max(self.timeout - (time.monotonic() - started_at), 0.1)
+        try:
+            result, worker_limit_hits = worker.call(_run_task, (task, *args), remaining)
+        except TimeoutError:
+            self._replace_worker(worker)
+            raise TimeoutError(f"La résolution a dépassé {self.timeout} s.")
+        except WorkerCrashed:
+            self._replace_worker(worker)
+            raise
+        except BaseException:
+            self._idle_workers.put(worker)
+            raise
+
+        self._idle_workers.put(worker)
+        limits.merge_limit_hits(worker_limit_hits)
+        return result
+
+    def handle(self, endpoint, body):
+        """Dispatch a POST request, returns (status, payload)."""
+        if endpoint == "/parse":
+            result = self.run(_parse_task, _require_string(body, "equation"))
+        elif endpoint == "/solve":
+            if "equations" in body:
+                equations = body["equations"]
+                if not isinstance(equations, list) or len(equations) < 2 or not all(isinstance(eq, str) for eq in equations):
+                    raise BadRequest("'equations' doit être une liste d'au moins deux équations.")
+                function_names = body.get("functions")
+                if function_names is not None and (not isinstance(function_names, list)
+                                                   or not all(isinstance(name, str) for name in function_names)):
+                    raise BadRequest("'functions' doit être une liste de noms de fonctions.")
+                result = self.run(_solve_system_task, equations, function_names)
+            else:
+                series_order = body.get("series_order")
+                if series_order is not None and (not isinstance(series_order, int) or isinstance(series_order, bool)):
+                    raise BadRequest("'series_order' doit être un entier.")
+                result = self.run(_solve_task, _require_string(body, "equation"), _parse_ics(body.get("ics")),
+                                  series_order)
+        elif endpoint == "/evaluate":
+            x_range = body.get("range", [-5, 5])
+            if not (isinstance(x_range, list) and len(x_range) == 2
+                    and all(_is_number(v) for v in x_range) and x_range[0] < x_range[1]):
+                raise BadRequest("'range' doit être une liste [gauche, droite] avec gauche < droite.")
+            num_points = body.get("points", 1000)
+            if not isinstance(num_points, int) or not 2 <= num_points <= MAX_EVALUATION_POINTS:
+                raise BadRequest(f"'points' doit être un entier entre 2 et {MAX_EVALUATION_POINTS}.")
+            constants_values = body.get("constants", {})
+            if not isinstance(constants_values, dict) or not all(_is_number(v) for v in constants_values.values()):
+                raise BadRequest("'constants' doit associer des noms à des nombres.")
+            result = self.run(_evaluate_task, _require_string(body, "expression"), x_range, num_points, constants_values)
+        else:
+            return 404, {"error": f"Point d'entrée inconnu : {endpoint}"}
+
+        payload, error = result
+        if error:
+            return 422, {"error": error}
+        return 200, payload
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._all_workers = self._all_workers, set()
+        for worker in workers:
+            worker.kill()
+
+
+def _is_number(value):
+    """Finite int or float, json.loads also accepts NaN and Infinity."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _require_string(body, key):
+    value = body.get(key)
+    if not isinstance(value, str) or not value.strip():
+        raise BadRequest(f"'{key}' doit être une chaîne non vide.")
+    return value
+
+
+def _parse_ics(ics):
+    """Validate initial conditions given as [{"x0": .., "y0": ..}, ...], one per derivative order."""
+    if ics is None:
+        return []
+    if not isinstance(ics, list) or not all(
+            isinstance(vals, dict) and _is_number(vals.get("x0")) and _is_number(vals.get("y0"))
+            for vals in ics):
+        raise BadRequest("'ics' doit être une liste de {\"x0\": nombre, \"y0\": nombre}.")
+    return [{"x0": vals["x0"], "y0": vals["y0"]} for vals in ics]
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive between requests
+    protocol_version = "HTTP/1.1"
+    server_version = "ODESolverAPI/1.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        started_at = time.perf_counter()
+        if self.path == "/health":
+            status, payload = 200, {"status": "ok", "workers": self.service.workers}
+        elif self.path == "/metrics":
+            status, payload = 200, {"endpoints": self.service.metrics.snapshot(),
+                                    "limits": limits.limit_hits_snapshot(),
+                                    "restarted_workers": self.service.restarted_workers}
+        else:
+            status, payload = 404, {"error": f"Point d'entrée inconnu : {self.path}"}
+        self.send_json(status, payload, started_at)
+
+    def do_POST(self):
+        started_at = time.perf_counter()
+        try:
+            body = self.read_json_body()
+            status, payload = self.service.handle(self.path, body)
+        except BadRequest as e:
+            status, payload = 400, {"error": str(e)}
+        except TimeoutError as e:
+            status, payload = 504, {"error": str(e)}
+        except WorkerCrashed:
+            status, payload = 503, {"error": "Le processus de résolution s'est arrêté de façon inattendue."}
+        except Exception as e:
+            status, payload = 500, {"error": f"Erreur imprévue ({e})"}
+        self.send_json(status, payload, started_at)
+
+    def read_json_body(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            raise BadRequest("En-tête Content-Length invalide.")
+        if length < 0:
+            self.close_connection = True
+            raise BadRequest("En-tête Content-Length invalide.")
+        if length > MAX_BODY_SIZE:
+            # The body is not read, the connection can't be reused
+            self.close_connection = True
+            raise BadRequest("Requête trop volumineuse.")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise BadRequest(f"JSON invalide ({e})")
+        if not isinstance(body, dict):
+            raise BadRequest("Le corps de la requête doit être un objet JSON.")
+        return body
+
+    def send_json(self, status, payload, started_at):
+        try:
+            data = json.dumps(payload, ensure_ascii=False, allow_nan=False).encode("utf-8")
+        except ValueError:
+            # NaN and infinities are not valid JSON
+            status = 500
+            payload = {"error": "La réponse contient des valeurs non finies."}
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        duration = time.perf_counter() - started_at
+        self.duration_ms = duration * 1000
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Server-Timing", f"total;dur={self.duration_ms:.1f}")
+        self.end_headers()
+        self.wfile.write(data)
+        endpoint = self.path if self.path in ENDPOINTS.get(self.command, ()) else "(inconnu)"
+        self.service.metrics.record(f"{self.command} {endpoint}", status, duration)
+
+    def log_request(self, code="-", size="-"):
+        # Per-request latency, in addition to the aggregated /metrics
+        self.log_message('"%s" %s %.1f ms', self.requestline, str(code), getattr(self, "duration_ms", 0.0))
+
+
+def create_server(host="127.0.0.1", port=8600, workers=2, timeout=60):
+    """Create the HTTP server and its warm worker pool, call serve_forever() to start it."""
+    service = SolverService(workers=workers, timeout=timeout)
+    service.warm_up()
+    server = ThreadingHTTPServer((host, port), ApiRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP du solveur d'EDO")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=2, help="nombre de processus de résolution")
+    parser.add_argument("--timeout", type=float, default=60, help="durée maximale d'une requête, en secondes")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.workers, args.timeout)
+    print(f"API du solveur sur http://{args.host}:{server.server_port} ({args.workers} processus)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
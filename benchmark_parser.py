@@ -0,0 +1,61 @@
+"""Compare the ODE parser with the previous regex + parse_expr front-end on long systems.
+
+Usage: python benchmark_parser.py [number of equations] [repeats]
+"""
+import re
+import sys
+import timeit
+
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application
+
+from calc import local_dict, parse_ode
+
+legacy_transformations = standard_transformations + (implicit_multiplication_application,)
+legacy_patterns = [
+    (re.compile(r"([a-wyzA-Z])('+)\(x\)"), lambda m: f"Derivative({m.group(1)}(x), (x, {len(m.group(2))}))"),
+    (re.compile(r"([a-wyzA-Z])\^?\((\d+)\)\(x\)"), lambda m: f"Derivative({m.group(1)}(x), (x, {m.group(2)}))"),
+    (re.compile(r"([a-wyzA-Z])(\d+)\(x\)"), lambda m: f"Derivative({m.group(1)}(x), (x, {m.group(2)}))"),
+]
+
+
+def legacy_parse(ode_string):
+    """The parsing path used before ode_parser, kept here as the reference."""
+    for pattern, replacement in legacy_patterns:
+        ode_string = pattern.sub(replacement, ode_string)
+    if len(sides := ode_string.split("=")) == 2:
+        ode_string = f"Eq({sides[0]}, {sides[1]})"
+    ode_string = ode_string.replace("^", "**")
+    return parse_expr(ode_string, local_dict=local_dict, transformations=legacy_transformations)
+
+
+def make_system(size):
+    """Build a coupled linear system of `size` equations over the functions f, h, o, p..."""
+    funcs = "fhopqrstuvw"
+    equations = []
+    for i in range(size):
+        name = funcs[i % len(funcs)]
+        rhs = " + ".join(f"{j + 1}*{funcs[j % len(funcs)]}(x)" for j in range(size))
+        equations.append(f"{name}''(x) + 2 omega {name}'(x) = {rhs} + F0 cos(Omega x)^2")
+    return equations
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    equations = make_system(size)
+
+    for eq_str in equations:
+        new, _, error = parse_ode(eq_str)
+        assert not error, error
+        assert new == legacy_parse(eq_str), eq_str
+
+    legacy_time = min(timeit.repeat(lambda: [legacy_parse(eq) for eq in equations], number=1, repeat=repeats))
+    new_time = min(timeit.repeat(lambda: [parse_ode(eq) for eq in equations], number=1, repeat=repeats))
+
+    print(f"{size} équations de {len(equations[0])} caractères")
+    print(f"regex + parse_expr : {legacy_time * 1000:.1f} ms")
+    print(f"ode_parser         : {new_time * 1000:.1f} ms ({legacy_time / new_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
-import re
-
 import sympy
 from sympy import Function, Derivative, Eq, dsolve, symbols, S
+from sympy.solvers.ode.systems import dsolve_system
 from sympy import gamma as Gamma, zeta as Zeta, beta as Beta
-from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application
 
-# Setup for parsing expressions
-transformations = standard_transformations + (implicit_multiplication_application,)
+from limits import (ResourceLimitError, MEMORY_ERROR_MESSAGE, record_limit_hit, check_ode_order,
+                    check_expression_size)
+from ode_parser import parse_ode_string, ParseError
+
+# Names available in ODE strings
 local_dict = {
     'x': symbols("x"),
     'Eq': Eq,
@@ -75,62 +76,13 @@ def get_solution_rhs(solution, func):
     return None
 
 
-def prepare_ode_input(ode_string: str):
-    """
-    Preprocesses ODE input by converting:
-    - f'(x), g'(x), h'(x), etc. to Derivative(f(x), (x, n))
-    - f^(n)(x), g^(n)(x), etc. to Derivative(f(x), (x, n))
-    - fn(x), gn(x), etc. to Derivative(f(x), (x, n))
-    - F(f, x) = G(f, x) to Eq(F(f, x), G(f, x))
-    - a^b to a**b
-    """
-    # Handle f'(x), g'(x), etc. notation for any single letter function except x
-    pattern1 = r"([a-wyzA-Z])('+)\(x\)"
-
-    def replacement1(match):
-        func_name = match.group(1)
-        derivative_order = len(match.group(2))
-        return f"Derivative({func_name}(x), (x, {derivative_order}))"
-
-    # Handle f^(n)(x), g^(n)(x), etc. notation for any single letter function except x
-    pattern2 = r"([a-wyzA-Z])\^?\((\d+)\)\(x\)"
-
-    def replacement2(match):
-        func_name = match.group(1)
-        derivative_order = int(match.group(2))
-        return f"Derivative({func_name}(x), (x, {derivative_order}))"
-
-    # Handle fn(x), gn(x), etc. notation for any single letter function except x
-    pattern3 = r"([a-wyzA-Z])(\d+)\(x\)"
-
-    def replacement3(match):
-        func_name = match.group(1)
-        derivative_order = int(match.group(2))
-        return f"Derivative({func_name}(x), (x, {derivative_order}))"
-
-    processed_string = re.sub(pattern1, replacement1, ode_string)
-    processed_string = re.sub(pattern2, replacement2, processed_string)
-    processed_string = re.sub(pattern3, replacement3, processed_string)
-
-    # Handle natural equality notation
-    if len(sides := processed_string.split("=")) == 2:
-        processed_string = f"Eq({sides[0]}, {sides[1]})"
-
-    # Handle exponentiation
-    processed_string = processed_string.replace("^", "**")
-
-    return processed_string
-
-
 def parse_ode(ode_string):
     """Parse an ODE string into a sympy equation."""
-    if not ode_string:
+    if not ode_string or not ode_string.strip():
         return None, None, "Équation vide"
 
-    ode_string = prepare_ode_input(ode_string)
-
     try:
-        parsed_ode = parse_expr(ode_string, local_dict=local_dict, transformations=transformations)
+        parsed_ode = parse_ode_string(ode_string, local_dict)
 
         if not isinstance(parsed_ode, Eq):
             # If user just entered an expression, assume it's LHS = 0
@@ -138,8 +90,15 @@ def parse_ode(ode_string):
         else:
             ode_eq = parsed_ode
 
+        check_expression_size(ode_eq)
         ode_order = get_ode_order(ode_eq, f_x)
+        # Derivatives of the other functions (systems) count towards the limit too
+        check_ode_order(max((d.derivative_count for d in ode_eq.atoms(Derivative)), default=0))
         return ode_eq, ode_order, ""
+    except ResourceLimitError as e:
+        return None, 0, str(e)
+    except ParseError as e:
+        return None, 0, f"Erreur de parsing à la position {e.position + 1}, verifiez la syntaxe ({e.message})."
     except Exception as e:
         return None, 0, f"Erreur de parsing, verifiez la syntaxe ({e})."
 
@@ -170,6 +129,9 @@ def solve_ode(ode_eq, ics_dict=None):
         return solution, ""
     except NotImplementedError:
         return None, "L'équation n'est pas supportée par l'application pour le moment."
+    except MemoryError:
+        record_limit_hit("memory")
+        return None, MEMORY_ERROR_MESSAGE
     except ValueError as e:
         return None, f"Une erreur est survenue durant la résolution ({e})"
     except Exception as e:
@@ -177,6 +139,22 @@ def solve_ode(ode_eq, ics_dict=None):
 
 
 def compute_nth_derivative(eq, n):
+    """Differentiate both sides of eq n times, raises ResourceLimitError if eq is too large."""
+    check_expression_size(eq)
     lhs = eq.lhs
     rhs = eq.rhs
     return Eq(sympy.diff(lhs, (x_sym, n)), sympy.diff(rhs, (x_sym, n)))
+
+
+def solve_ode_system(system_eqs, func_list):
+    """Solve a system of ODEs for the given functions."""
+    try:
+        solution = dsolve_system(system_eqs, func_list)
+        return solution, ""
+    except NotImplementedError:
+        return None, "Le système n'est pas supporté par l'application pour le moment."
+    except MemoryError:
+        record_limit_hit("memory")
+        return None, MEMORY_ERROR_MESSAGE
+    except Exception as e:
+        return None, f"Erreur: {e}"
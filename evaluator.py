@@ -0,0 +1,136 @@
+import collections
+
+import mpmath
+import numpy as np
+import sympy
+from sympy import lambdify
+
+# Relative precision expected from the float64 pass, and digits of the first mpmath pass
+FLOAT_TOLERANCE = 1e-12
+START_PRECISION = 30
+MAX_PRECISION = 480
+
+# Sum of |terms| over |value| beyond which a sum is considered to have lost its float64 digits
+CANCELLATION_RATIO = 1e10
+
+Evaluation = collections.namedtuple("Evaluation", ["values", "log10_abs", "refined_count", "overflowed"])
+Evaluation.__doc__ = """Values of an expression on a grid.
+
+values          float64 values, NaN where the expression is undefined or not real,
+                ±inf where the value is beyond the float64 range
+log10_abs       log10 of |value|, finite even where values overflow
+refined_count   number of points that were re-evaluated with mpmath
+overflowed      True if some values are beyond the float64 range
+"""
+
+_numpy_modules = ['numpy', {'Heaviside': lambda x: np.heaviside(x, 0.5)}]
+_mpmath_modules = ['mpmath', {'Heaviside': lambda x: mpmath.mpf(1) if x > 0 else (mpmath.mpf(0.5) if x == 0 else mpmath.mpf(0))}]
+
+
+def evaluate_expression(expr, x_sym, x_vals):
+    """Evaluate expr on x_vals, with NumPy first and mpmath only where float64 fails.
+
+    Points are re-evaluated with mpmath, at increasing precision until two
+    precisions agree, when the float64 value is not finite (overflow, inf - inf,
+    0 * inf...) or when a sum lost its digits to cancellation.
+    """
+    x_vals = np.asarray(x_vals, dtype=float)
+    values = _numpy_values(expr, x_sym, x_vals)
+
+    suspect = ~np.isfinite(values)
+    if expr.is_Add:
+        suspect |= _cancellation_mask(expr, x_sym, x_vals, values)
+    if suspect.any():
+        suspect &= ~_non_real_mask(expr, x_sym, x_vals, suspect)
+
+    with np.errstate(all="ignore"):
+        log10_abs = np.log10(np.abs(values))
+
+    refined_indices = np.flatnonzero(suspect)
+    if refined_indices.size:
+        mp_func = lambdify(x_sym, expr, modules=_mpmath_modules)
+        for i in refined_indices:
+            y = _mpmath_value(mp_func, x_vals[i])
+            if y is None:
+                values[i] = log10_abs[i] = np.nan
+            elif y == 0:
+                values[i], log10_abs[i] = 0.0, -np.inf
+            else:
+                log10_abs[i] = float(mpmath.log10(abs(y)))
+                values[i] = float(y) if log10_abs[i] < 308 else np.copysign(np.inf, float(mpmath.sign(y)))
+
+    return Evaluation(values, log10_abs, int(refined_indices.size), bool(np.isinf(values).any()))
+
+
+def _numpy_values(expr, x_sym, x_vals):
+    """Vectorized float64 pass, NaN where the result is not real, all NaN if NumPy can't evaluate expr."""
+    try:
+        func = lambdify(x_sym, expr, modules=_numpy_modules)
+        with np.errstate(all="ignore"):
+            result = np.asarray(func(x_vals))
+        result = np.broadcast_to(result, x_vals.shape)
+    except (NameError, TypeError, ValueError, AttributeError, ZeroDivisionError, OverflowError):
+        # Functions without a NumPy counterpart (zeta...) are left to mpmath
+        return np.full(x_vals.shape, np.nan)
+
+    if np.iscomplexobj(result):
+        real = result.real.astype(float)
+        real[np.abs(result.imag) > FLOAT_TOLERANCE * np.maximum(np.abs(result.real), 1.0)] = np.nan
+        return real
+
+    try:
+        return result.astype(float)
+    except (TypeError, ValueError):
+        return np.full(x_vals.shape, np.nan)
+
+
+def _cancellation_mask(expr, x_sym, x_vals, values):
+    """Points where the terms of the sum are much larger than the sum itself."""
+    abs_sum = sympy.Add(*[sympy.Abs(term) for term in expr.args])
+    magnitudes = _numpy_values(abs_sum, x_sym, x_vals)
+    with np.errstate(all="ignore"):
+        return np.isfinite(values) & (magnitudes > CANCELLATION_RATIO * np.abs(values))
+
+
+def _non_real_mask(expr, x_sym, x_vals, candidates):
+    """Among the candidates, points where NumPy evaluates expr to a finite, clearly non-real, value."""
+    mask = np.zeros(x_vals.shape, dtype=bool)
+    try:
+        func = lambdify(x_sym, expr, modules=_numpy_modules)
+        with np.errstate(all="ignore"):
+            result = np.broadcast_to(np.asarray(func(x_vals[candidates].astype(complex)), dtype=complex),
+                                     x_vals[candidates].shape)
+    except (NameError, TypeError, ValueError, AttributeError, ZeroDivisionError, OverflowError):
+        return mask
+
+    finite = np.isfinite(result)
+    mask[candidates] = finite & (np.abs(result.imag) > 1e-6 * np.maximum(np.abs(result.real), 1.0))
+    return mask
+
+
+def _mpmath_value(mp_func, x):
+    """Real value of mp_func at x, with precision increased until two evaluations agree. None if undefined."""
+    previous = None
+    dps = START_PRECISION
+    while dps <= MAX_PRECISION:
+        with mpmath.workdps(dps):
+            try:
+                y = mp_func(mpmath.mpf(x))
+            except (ZeroDivisionError, ValueError, TypeError, OverflowError):
+                return None
+            if isinstance(y, mpmath.mpc):
+                if abs(y.imag) > FLOAT_TOLERANCE * max(abs(y.real), 1):
+                    return None
+                y = y.real
+            if not isinstance(y, mpmath.mpf):
+                try:
+                    y = mpmath.mpf(y)
+                except (TypeError, ValueError):
+                    return None
+            if not mpmath.isfinite(y):
+                return None
+            if previous is not None and abs(y - previous) <= FLOAT_TOLERANCE * abs(y):
+                return y
+        previous = y
+        dps *= 2
+    return previous
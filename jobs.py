@@ -0,0 +1,117 @@
+import multiprocessing
+import time
+import weakref
+
+from limits import (MAX_JOB_SECONDS, MEMORY_ERROR_MESSAGE, apply_memory_limit, limit_hits_snapshot, merge_limit_hits,
+                    record_limit_hit)
+
+# Workers are spawned rather than forked: the Streamlit server is multithreaded
+# and forking it can deadlock the child.
+_mp_context = multiprocessing.get_context("spawn")
+
+
+def _run_job(conn, func, args):
+    """Entry point of the worker process, sends back func's (result, error) tuple and the limits hit."""
+    apply_memory_limit()
+    try:
+        outcome = func(*args)
+    except MemoryError:
+        record_limit_hit("memory")
+        outcome = (None, MEMORY_ERROR_MESSAGE)
+    except Exception as e:
+        outcome = (None, f"Une erreur imprévue est survenue durant la résolution ({e})")
+    try:
+        conn.send((outcome, limit_hits_snapshot()))
+    finally:
+        conn.close()
+
+
+_UNEXPECTED_STOP_MESSAGE = "Le processus de résolution s'est arrêté de façon inattendue."
+
+
+def _kill_process(process):
+    """Kill a worker process if it is still running, safe to call from any thread."""
+    if process.is_alive():
+        process.kill()
+
+
+class SolveJob:
+    """Handle on a solver call running in a separate process.
+
+    func must be a module-level function returning a (result, error) tuple,
+    like calc.solve_ode. The job can be polled without blocking and cancelled,
+    which kills the worker process. The worker is also killed once the job runs
+    longer than timeout seconds (0 disables it), or when the job is garbage
+    collected, so that a solve nobody waits for anymore does not keep running.
+    """
+
+    def __init__(self, func, *args, label="Chargement...", timeout=MAX_JOB_SECONDS):
+        self.label = label
+        self.timeout = timeout
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.cancelled = False
+        self._outcome = None
+        self._kill_reason = None  # error reported if the worker was killed by kill()
+
+        self._receiver, sender = _mp_context.Pipe(duplex=False)
+        self._process = _mp_context.Process(target=_run_job, args=(sender, func, args), daemon=True)
+        self._process.start()
+        sender.close()
+        self._finalizer = weakref.finalize(self, _kill_process, self._process)
+
+    def elapsed(self):
+        """Seconds since the job was submitted, frozen once it is over."""
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    def poll(self):
+        """Return True once the job is over (finished, crashed or cancelled)."""
+        if self.finished_at is not None:
+            return True
+
+        if self._receiver.poll():
+            try:
+                self._outcome, worker_limit_hits = self._receiver.recv()
+                merge_limit_hits(worker_limit_hits)
+            except EOFError:
+                self._outcome = (None, self._kill_reason or _UNEXPECTED_STOP_MESSAGE)
+            self._finish()
+        elif not self._process.is_alive():
+            # The worker died without sending anything (killed, out of memory...)
+            self._outcome = (None, self._kill_reason or _UNEXPECTED_STOP_MESSAGE)
+            self._finish()
+        elif 0 < self.timeout < self.elapsed():
+            record_limit_hit("job_time")
+            self._process.kill()
+            self._outcome = (None, f"La résolution a dépassé le temps autorisé ({self.timeout} s), "
+                                   f"l'équation est probablement trop complexe.")
+            self._finish()
+
+        return self.finished_at is not None
+
+    def result(self):
+        """Return the (result, error) tuple of a finished job, None while it is running."""
+        return self._outcome
+
+    def kill(self, reason):
+        """Kill the worker process from any thread, the job ends with reason as its error at the next poll."""
+        self._kill_reason = reason
+        self._finalizer()
+
+    def cancel(self):
+        """Kill the worker process, unless the job is already over."""
+        if self.poll():
+            return
+        self._process.terminate()
+        self.cancelled = True
+        self._outcome = (None, "Résolution annulée.")
+        self._finish()
+
+    def _finish(self):
+        self.finished_at = time.monotonic()
+        self._process.join(timeout=1)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._receiver.close()
@@ -0,0 +1,182 @@
+"""Resource limits protecting the server from inputs that are too costly to handle.
+
+Each limit can be configured with an environment variable, 0 disables it:
+    ODE_SOLVER_MAX_MEMORY_MB        memory a solver process may allocate (address space, Linux only)
+    ODE_SOLVER_MAX_EXPRESSION_SIZE  nodes of an expression before rendering, lambdify or differentiation
+    ODE_SOLVER_MAX_ORDER            order of an ODE
+    ODE_SOLVER_MAX_SYSTEM_SIZE      number of equations in a system
+    ODE_SOLVER_MAX_JOB_SECONDS      wall-clock time of a solve job started from the interface
+    ODE_SOLVER_MAX_NUMBER_DIGITS    digits of an exact number computed while parsing (9^9^9)
+"""
+import collections
+import math
+import os
+import threading
+
+from sympy import Rational, preorder_traversal
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _limit_from_env(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+MAX_SOLVER_MEMORY_MB = _limit_from_env("ODE_SOLVER_MAX_MEMORY_MB", 2048)
+MAX_EXPRESSION_SIZE = _limit_from_env("ODE_SOLVER_MAX_EXPRESSION_SIZE", 10000)
+MAX_ODE_ORDER = _limit_from_env("ODE_SOLVER_MAX_ORDER", 10)
+MAX_SYSTEM_SIZE = _limit_from_env("ODE_SOLVER_MAX_SYSTEM_SIZE", 8)
+MAX_JOB_SECONDS = _limit_from_env("ODE_SOLVER_MAX_JOB_SECONDS", 300)
+MAX_NUMBER_DIGITS = _limit_from_env("ODE_SOLVER_MAX_NUMBER_DIGITS", 10000)
+
+# Parsing evaluates sympy functions of exact numbers eagerly: combinatorial functions are limited to
+# small integers, and roots or functions of a number (sqrt, log...) to numbers sympy can factor quickly
+MAX_COMBINATORIAL_ARGUMENT = 500
+MAX_FACTORED_DIGITS = 300
+
+MEMORY_ERROR_MESSAGE = (f"La résolution a dépassé la mémoire autorisée ({MAX_SOLVER_MEMORY_MB} Mo), "
+                        f"l'équation est probablement trop complexe.")
+
+# Number of times each limit was hit in this process
+limit_hits = collections.Counter()
+_limit_hits_lock = threading.Lock()
+
+
+class ResourceLimitError(Exception):
+    """Raised when an input exceeds one of the limits, limit is the name of the counter."""
+
+    def __init__(self, limit, message):
+        super().__init__(message)
+        self.limit = limit
+
+
+def record_limit_hit(limit):
+    with _limit_hits_lock:
+        limit_hits[limit] += 1
+
+
+def merge_limit_hits(hits):
+    """Add the counters reported by a worker process to this process' counters."""
+    with _limit_hits_lock:
+        limit_hits.update(hits)
+
+
+def limit_hits_snapshot():
+    with _limit_hits_lock:
+        return dict(limit_hits)
+
+
+def apply_memory_limit():
+    """Cap the address space of the current process, meant to be called in solver worker processes.
+
+    The cap is added on top of what the process already uses, so that it only
+    bounds the memory allocated by the solver. Allocations beyond it raise MemoryError.
+    """
+    if resource is None or MAX_SOLVER_MEMORY_MB <= 0:
+        return
+
+    try:
+        with open("/proc/self/statm") as statm:
+            current_size = int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        current_size = 0
+
+    limit = current_size + MAX_SOLVER_MEMORY_MB * 1024 * 1024
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+    if hard_limit != resource.RLIM_INFINITY:
+        limit = min(limit, hard_limit)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard_limit))
+
+
+def expression_size(expr, limit=None):
+    """Number of nodes in the expression tree, counting stops after limit."""
+    size = 0
+    for _ in preorder_traversal(expr):
+        size += 1
+        if limit is not None and size > limit:
+            break
+    return size
+
+
+def check_expression_size(expr):
+    """Raise ResourceLimitError if expr (or a list of expressions) is too large to be handled."""
+    if MAX_EXPRESSION_SIZE <= 0:
+        return
+
+    exprs = expr if isinstance(expr, (list, tuple)) else [expr]
+    remaining = MAX_EXPRESSION_SIZE
+    for item in exprs:
+        remaining -= expression_size(item, remaining)
+        if remaining < 0:
+            record_limit_hit("expression_size")
+            raise ResourceLimitError(
+                "expression_size",
+                f"L'expression est trop grande pour être traitée (plus de {MAX_EXPRESSION_SIZE} nœuds)."
+            )
+
+
+def _number_size_error(digits):
+    record_limit_hit("number_size")
+    return ResourceLimitError("number_size",
+                              f"Le nombre est trop grand pour être calculé (plus de {digits} chiffres).")
+
+
+def _digits(number):
+    """Number of digits (as a float) of a sympy Rational's numerator or denominator, the largest."""
+    return max(math.log10(abs(number.p)) if number.p else 0, math.log10(number.q))
+
+
+def check_power_size(base, exponent):
+    """Raise ResourceLimitError if base**exponent is an exact number too costly to compute.
+
+    Meant to be called before building the power, sympy computes powers of rationals eagerly.
+    """
+    if MAX_NUMBER_DIGITS <= 0 or not (base.is_Rational and exponent.is_Rational) or exponent == 0:
+        return
+
+    base_digits = _digits(base)
+    if not exponent.is_Integer and base_digits > MAX_FACTORED_DIGITS:
+        raise _number_size_error(MAX_FACTORED_DIGITS)
+    # The power has base_digits * |exponent| digits, compared as logarithms as the exponent can be huge
+    log_exponent = math.log10(abs(exponent.p)) - math.log10(exponent.q)
+    if base_digits and math.log10(base_digits) + log_exponent > math.log10(MAX_NUMBER_DIGITS):
+        raise _number_size_error(MAX_NUMBER_DIGITS)
+
+
+def check_function_arguments(func, args):
+    """Raise ResourceLimitError if func is a sympy function applied to a number too costly to evaluate it on."""
+    module = getattr(func, "__module__", None) or ""
+    if MAX_NUMBER_DIGITS <= 0 or not module.startswith("sympy.functions"):
+        return
+
+    numbers = [arg for arg in args if isinstance(arg, Rational)]
+    if module.startswith("sympy.functions.combinatorial") and any(abs(n) > MAX_COMBINATORIAL_ARGUMENT for n in numbers):
+        record_limit_hit("number_size")
+        raise ResourceLimitError("number_size", f"Les fonctions combinatoires sont limitées aux entiers inférieurs "
+                                                f"à {MAX_COMBINATORIAL_ARGUMENT}.")
+    if any(_digits(n) > MAX_FACTORED_DIGITS for n in numbers):
+        raise _number_size_error(MAX_FACTORED_DIGITS)
+
+
+def check_ode_order(order):
+    if 0 < MAX_ODE_ORDER < order:
+        record_limit_hit("ode_order")
+        raise ResourceLimitError(
+            "ode_order",
+            f"L'ordre de l'équation ({order}) dépasse le maximum autorisé ({MAX_ODE_ORDER})."
+        )
+
+
+def check_system_size(size):
+    if 0 < MAX_SYSTEM_SIZE < size:
+        record_limit_hit("system_size")
+        raise ResourceLimitError(
+            "system_size",
+            f"Le système contient trop d'équations ({size}, maximum {MAX_SYSTEM_SIZE})."
+        )
@@ -7,8 +7,11 @@ from ui import (
     render_system_input,
     render_solve_system_button,
     render_initial_conditions,
+    render_series_options,
     render_solve_button,
+    render_solve_job,
     display_solution, show_intructions,
+    render_session_metrics,
 )
 
 
@@ -23,9 +26,12 @@ def main():
         render_equation_input()
         render_solve_button()
         render_initial_conditions()
+        render_series_options()
 
+    render_solve_job()
     display_solution()
     show_intructions()
+    render_session_metrics()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,417 @@
+import functools
+import re
+import unicodedata
+
+import sympy
+from sympy import Add, Eq, Function, Mul, Pow, Symbol
+from sympy.core.function import FunctionClass, UndefinedFunction
+
+from limits import ResourceLimitError, check_function_arguments, check_power_size
+
+# Single tokenizer pass, the first matching alternative wins
+_token_regex = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<primes>'+)
+  | (?P<op>\*\*|==|[-+*/^(),=])
+""", re.VERBOSE)
+
+# Letters that can name an unknown function in derivative notations (x is the variable)
+_function_letters = frozenset("abcdefghijklmnopqrstuvwyzABCDEFGHIJKLMNOPQRSTUVWYZ")
+
+# Derivative notation fn(x): function letter followed by the order
+_numbered_derivative_regex = re.compile(r"([A-Za-z]*?)([a-wyzA-Z])(\d+)")
+
+# Names taken from sympy when they are not in the parser namespace (tan, sinh, oo, I...)
+_sympy_namespace = {}
+exec("from sympy import *", _sympy_namespace)
+
+
+def _power(base, exponent):
+    """Pow, refused when it would compute a huge exact number."""
+    check_power_size(sympy.sympify(base), sympy.sympify(exponent))
+    return Pow(base, exponent)
+
+
+def _default_precision(func):
+    """func restricted to its value argument, a precision argument could make parsing arbitrarily slow."""
+    @functools.wraps(func)
+    def apply(value):
+        return func(value)
+    return apply
+
+
+# Python builtins and sympy constructors that parse_expr accepted, only when called as name(...).
+# Parsing runs in the interface process on every rerun, so nothing here may compute: diff and
+# integrate build unevaluated objects, simplify, expand, factor... are not accepted, N and Float
+# keep the default precision and powers are checked by the resource limits.
+_whitelisted_functions = {
+    "abs": sympy.Abs,
+    "max": sympy.Max,
+    "min": sympy.Min,
+    "pow": _power,
+    "Pow": _power,
+    "diff": sympy.Derivative,
+    "integrate": sympy.Integral,
+    "N": _default_precision(sympy.N),
+    "Float": _default_precision(sympy.Float),
+    **{name: getattr(sympy, name) for name in (
+        "Abs", "Max", "Min", "Add", "Mul", "Rational", "Integer", "Integral",
+    )},
+}
+
+
+class ParseError(Exception):
+    """Syntax error in an ODE string, position is the index of the offending character."""
+
+    def __init__(self, message, position):
+        super().__init__(message)
+        self.message = message
+        self.position = position
+
+
+class Token:
+    __slots__ = ("kind", "value", "position")
+
+    def __init__(self, kind, value, position):
+        self.kind = kind
+        self.value = value
+        self.position = position
+
+    def __repr__(self):
+        return f"Token({self.kind}, {self.value!r}, {self.position})"
+
+
+def tokenize(text):
+    """Split an ODE string into tokens, in a single pass."""
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _token_regex.match(text, position)
+        if match is None:
+            raise ParseError(f"caractère inattendu '{text[position]}'", position)
+        kind = match.lastgroup
+        if kind != "space":
+            tokens.append(Token(kind, match.group(), position))
+        position = match.end()
+    tokens.append(Token("end", "", len(text)))
+    return tokens
+
+
+class OdeParser:
+    """Recursive descent parser building sympy objects directly from an ODE string.
+
+    Grammar, from loosest to tightest binding:
+        equation := expr (('=' | '==') expr)?
+        expr     := term (('+' | '-') term)*
+        term     := unary (('*' | '/') unary | unary)*     juxtaposition is multiplication
+        unary    := ('+' | '-') unary | power
+        power    := primary (('^' | '**') unary)?          right associative
+        primary  := number | name [call | derivative] | '(' expr (',' expr)* ')'
+
+    Derivatives can be written f'(x), f^(n)(x), f(n)(x) or fn(x), and known
+    functions can be applied without parentheses (sin 2x, the argument spans
+    the juxtaposed factors) or raised to a power before their argument
+    (sin^2(x)). Names missing from the namespace are split into single letters
+    (mg is m*g), like sympy's split_symbols, unless they are called: an unknown
+    name followed by '(' is an error, except when only its last letter is a
+    function (kf(x) is k*f(x)).
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.variable = namespace.get("x", Symbol("x"))
+        self.tokens = []
+        self.index = 0
+
+    def parse(self, text):
+        """Parse text into an Eq, or an expression if there is no equal sign."""
+        self.tokens = tokenize(text)
+        self.index = 0
+
+        if self.peek().kind == "end":
+            raise ParseError("équation vide", 0)
+
+        lhs = self.check_value(self.parse_expr(), self.tokens[0])
+        if self.peek().value in ("=", "=="):
+            equal_token = self.advance()
+            rhs = self.check_value(self.parse_expr(), equal_token)
+            if self.peek().value in ("=", "=="):
+                raise ParseError("une équation ne peut contenir qu'un seul signe '='", self.peek().position)
+            # Not evaluated: deciding whether both sides are equal can take longer than parsing
+            result = Eq(lhs, rhs, evaluate=False)
+        else:
+            result = lhs
+
+        if self.peek().kind != "end":
+            token = self.peek()
+            raise ParseError(f"symbole inattendu '{token.value}'", token.position)
+        return result
+
+    # Token helpers
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.index + offset, len(self.tokens) - 1)]
+
+    def advance(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def expect(self, value):
+        token = self.peek()
+        if token.value != value:
+            raise ParseError(f"'{value}' attendu {_describe(token)}", token.position)
+        return self.advance()
+
+    def starts_operand(self, token):
+        return token.kind in ("number", "name") or token.value == "("
+
+    # Grammar rules
+
+    def parse_expr(self):
+        first_token = self.peek()
+        terms = [self.parse_term()]
+        while self.peek().value in ("+", "-"):
+            token = self.advance()
+            operator = token.value
+            term = self.check_value(self.parse_term(), token)
+            terms.append(term if operator == "+" else -term)
+        if len(terms) == 1:
+            return terms[0]
+        return Add(self.check_value(terms[0], first_token), *terms[1:])
+
+    def parse_term(self):
+        first_token = self.peek()
+        factors = [self.parse_unary()]
+        while True:
+            token = self.peek()
+            if token.value in ("*", "/"):
+                self.advance()
+                factor = self.check_value(self.parse_unary(), token)
+                factors.append(factor if token.value == "*" else Pow(factor, -1))
+            elif self.starts_operand(token):
+                factors.append(self.check_value(self.parse_unary(), token))
+            else:
+                break
+        if len(factors) == 1:
+            return factors[0]
+        return Mul(self.check_value(factors[0], first_token), *factors[1:])
+
+    def parse_unary(self):
+        token = self.peek()
+        if token.value in ("+", "-"):
+            self.advance()
+            operand = self.check_value(self.parse_unary(), token)
+            return operand if token.value == "+" else -operand
+        return self.parse_power()
+
+    def parse_power(self):
+        base = self.parse_primary()
+        token = self.peek()
+        if token.value in ("^", "**"):
+            self.advance()
+            exponent = self.check_value(self.parse_unary(), token)
+            return _power(self.check_value(base, token), exponent)
+        return base
+
+    def parse_primary(self):
+        token = self.peek()
+        if token.kind == "number":
+            self.advance()
+            if any(char in token.value for char in ".eE"):
+                return sympy.Float(token.value)
+            return sympy.Integer(token.value)
+        if token.kind == "name":
+            return self.parse_name()
+        if token.value == "(":
+            self.advance()
+            items = self.parse_arguments(")")
+            self.expect(")")
+            return items[0] if len(items) == 1 else tuple(items)
+        raise ParseError(f"expression attendue {_describe(token)}", token.position)
+
+    def parse_arguments(self, closing):
+        items = [self.parse_expr()]
+        while self.peek().value == ",":
+            self.advance()
+            if self.peek().value == closing:
+                break
+            items.append(self.parse_expr())
+        return items
+
+    def parse_name(self):
+        token = self.advance()
+        name = token.value
+
+        derivative = self.parse_derivative_notation(token)
+        if derivative is not None:
+            return derivative
+
+        obj = self.resolve(name)
+        if obj is None and self.peek().value == "(":
+            obj = _whitelisted_functions.get(name)
+            if obj is None and not self.can_split_call(name):
+                raise ParseError(f"fonction inconnue '{name}'", token.position)
+        if obj is None:
+            return self.split_name(token)
+
+        if callable(obj) and not isinstance(obj, sympy.Basic):
+            return self.parse_application(obj, token)
+
+        return obj
+
+    def parse_application(self, func, token):
+        """Apply a known function, written func(args), func^n(args) or func arg."""
+        next_token = self.peek()
+
+        if next_token.value == "(":
+            self.advance()
+            args = self.parse_arguments(")") if self.peek().value != ")" else []
+            self.expect(")")
+            return self.call(func, args, token)
+
+        # sin^2(x)
+        if (next_token.value in ("^", "**") and self.peek(1).kind == "number"
+                and self.peek(2).value == "(" and not isinstance(func, UndefinedFunction)):
+            self.advance()
+            exponent = sympy.sympify(self.advance().value)
+            self.advance()
+            args = self.parse_arguments(")")
+            self.expect(")")
+            return _power(self.call(func, args, token), exponent)
+
+        # sin 2x, the argument is the whole juxtaposition, as with parse_expr
+        if self.starts_operand(next_token) and not isinstance(func, UndefinedFunction):
+            factors = [self.parse_power()]
+            while self.starts_operand(self.peek()):
+                factor_token = self.peek()
+                factors.append(self.check_value(self.parse_power(), factor_token))
+            if len(factors) == 1:
+                return self.call(func, factors, token)
+            return self.call(func, [Mul(self.check_value(factors[0], next_token), *factors[1:])], token)
+
+        if isinstance(func, UndefinedFunction):
+            # Function letter used as a constant, as in "-mg"
+            return Symbol(token.value)
+
+        raise ParseError(f"arguments attendus après '{token.value}'", next_token.position)
+
+    def parse_derivative_notation(self, token):
+        """Parse f'(x), f^(n)(x), f(n)(x) or fn(x) starting at a name token, None if it is not one."""
+        name = token.value
+        start = self.index
+
+        prefix, letter, order = None, None, None
+
+        if self.peek().kind == "primes" and name[-1] in _function_letters:
+            prefix, letter = name[:-1], name[-1]
+            order = len(self.peek().value)
+            self.advance()
+        elif name in _function_letters or (name[-1] in _function_letters and self.resolve(name) is None):
+            prefix, letter = name[:-1], name[-1]
+            if self.peek().value == "^":
+                self.advance()
+            if (self.peek().value == "(" and self.peek(1).kind == "number"
+                    and self.peek(1).value.isdigit() and self.peek(2).value == ")"
+                    and self.peek(3).value == "("):
+                order = int(self.peek(1).value)
+                self.index += 3
+        elif self.resolve(name) is None and (match := _numbered_derivative_regex.fullmatch(name)):
+            prefix, letter, order = match.group(1), match.group(2), int(match.group(3))
+
+        if order is None or not self.at_variable_argument():
+            self.index = start
+            return None
+
+        self.index += 3  # (x)
+        func = self.namespace.get(letter)
+        if not isinstance(func, UndefinedFunction):
+            func = Function(letter)
+        derivative = sympy.Derivative(func(self.variable), (self.variable, order)) if order else func(self.variable)
+
+        if prefix:
+            return Mul(self.split_name(Token("name", prefix, token.position), allow_application=False), derivative)
+        return derivative
+
+    def at_variable_argument(self):
+        return (self.peek().value == "(" and self.peek(1).kind == "name"
+                and self.peek(1).value == str(self.variable) and self.peek(2).value == ")")
+
+    # Name resolution
+
+    def resolve(self, name):
+        """Object bound to name in the namespace or in sympy, None if the name is unknown."""
+        if name in self.namespace:
+            return self.namespace[name]
+        if len(name) > 1 or name == "I":
+            obj = _sympy_namespace.get(name)
+            if isinstance(obj, (sympy.Basic, FunctionClass)):
+                return obj
+            if callable(obj) and getattr(obj, "__module__", "").startswith("sympy.functions"):
+                return obj
+        return None
+
+    def split_name(self, token, allow_application=True):
+        """Turn an unknown name into a product of single letters and digits, or a symbol."""
+        name = token.value
+        if len(name) == 1 or "_" in name or _is_greek(name):
+            return Symbol(name)
+
+        factors = []
+        for chunk in re.findall(r"\d+|[A-Za-z]", name):
+            if chunk.isdigit():
+                factors.append(sympy.Integer(chunk))
+                continue
+            obj = self.namespace.get(chunk)
+            factors.append(obj if isinstance(obj, sympy.Basic) else Symbol(chunk))
+
+        # The last letter can still be applied, as in "kf(x)"
+        if allow_application and self.peek().value == "(" and isinstance(self.namespace.get(name[-1]), UndefinedFunction):
+            factors[-1] = self.parse_application(self.namespace[name[-1]], Token("name", name[-1], token.position))
+
+        return Mul(*factors)
+
+    def can_split_call(self, name):
+        """Whether an unknown name followed by '(' is a product of symbols, rather than a misspelled function."""
+        if len(name) == 1 or "_" in name or _is_greek(name):
+            return True
+        # Only the last letter may be a function, "cost(x)" is not c*o*s*t(x)
+        return (isinstance(self.namespace.get(name[-1]), UndefinedFunction)
+                and not any(isinstance(self.namespace.get(letter), UndefinedFunction) for letter in name[:-1]))
+
+    # Checks
+
+    def call(self, func, args, token):
+        check_function_arguments(func, args)
+        try:
+            return func(*args)
+        except ResourceLimitError:
+            raise
+        except Exception as e:
+            raise ParseError(f"appel invalide de '{token.value}' ({e})", token.position)
+
+    def check_value(self, value, token):
+        if isinstance(value, tuple):
+            raise ParseError("tuple inattendu dans une expression", token.position)
+        return value
+
+
+def _describe(token):
+    if token.kind == "end":
+        return "en fin d'équation"
+    return f"au lieu de '{token.value}'"
+
+
+def _is_greek(name):
+    try:
+        unicodedata.lookup(f"GREEK SMALL LETTER {name}")
+        return True
+    except KeyError:
+        return False
+
+
+def parse_ode_string(text, namespace):
+    """Parse an ODE string into an Eq (or an expression) with names resolved in namespace."""
+    return OdeParser(namespace).parse(text)
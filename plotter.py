@@ -1,10 +1,15 @@
 import matplotlib.pyplot as plt
 import numpy as np
-from sympy import lambdify
 
+from evaluator import Evaluation, evaluate_expression
+from limits import ResourceLimitError, check_expression_size
 
-def create_solution_plot(sol_rhs, x_sym, x_range, num_points=1000, constants_values=None):
-    """Create a plot of the solution with smart range selection."""
+
+def create_solution_plot(sol_rhs, x_sym, x_range, num_points=1000, constants_values=None, evaluate=None):
+    """Create a plot of the solution with smart range selection.
+
+    evaluate is an optional faster NumPy function computing the solution, like series.horner_callable.
+    """
     if sol_rhs is None:
         return None, None, "Solution indisponible pour le graphe"
 
@@ -26,31 +31,38 @@ def create_solution_plot(sol_rhs, x_sym, x_range, num_points=1000, constants_val
         if unresolved_constants and not constants_values:
             return None, unresolved_constants, "Les constantes doivent être précisées pour le graphe"
 
-        # Prepare for numerical evaluation
-        modules_for_lambdify = ['numpy', {'Heaviside': lambda x: np.heaviside(x, 0.5)}]
-        y_numpy_func = lambdify(x_sym, sol_rhs, modules=modules_for_lambdify)
-
         # Generate x values for plotting
+        check_expression_size(sol_rhs)
         x_vals_plot = np.linspace(x_range[0], x_range[1], num_points)
-        y_vals_plot = np.empty_like(x_vals_plot, dtype=float)
 
-        # Evaluate safely
-        for i, val in enumerate(x_vals_plot):
-            try:
-                y_vals_plot[i] = y_numpy_func(val)
-            except (NameError, TypeError, ValueError):
-                y_vals_plot[i] = np.nan
+        evaluation = None
+        if evaluate is not None:
+            with np.errstate(all="ignore"):
+                values = evaluate(x_vals_plot)
+            if np.isfinite(values).all():
+                evaluation = Evaluation(values, None, 0, False)
+        if evaluation is None:
+            # Evaluate with NumPy, falling back to mpmath where float64 overflows or loses precision
+            evaluation = evaluate_expression(sol_rhs, x_sym, x_vals_plot)
 
         # Create the plot
         fig, ax = plt.subplots()
-        ax.plot(x_vals_plot, y_vals_plot)
+        if evaluation.overflowed:
+            # Values beyond the float64 range can only be shown through their magnitude
+            ax.plot(x_vals_plot, evaluation.log10_abs)
+            ax.set_ylabel("log₁₀|y(x)|")
+            ax.set_title("Graphe de la solution (échelle logarithmique)")
+        else:
+            ax.plot(x_vals_plot, evaluation.values)
+            ax.set_ylabel("y(x)")
+            ax.set_title("Graphe de la solution")
         ax.set_xlabel("x")
-        ax.set_ylabel("y(x)")
-        ax.set_title("Graphe de la solution")
         ax.grid(True)
         ax.set_xlim(x_range)
 
         return fig, unresolved_constants, ""
+    except ResourceLimitError as e:
+        return None, None, str(e)
     except Exception as e:
         return None, None, f"Erreur de dessin: {e}"
 
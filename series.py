@@ -0,0 +1,492 @@
+"""Truncated power series solutions of ODEs around the initial point.
+
+The ODE is rewritten as f^(n)(x) = F(x, f, f', ..., f^(n-1)) and F is turned
+into a tree of Taylor nodes. Each node computes the coefficients of its series
+one degree at a time, with the usual recurrences (Cauchy product, exp, sin/cos...)
+on the coefficients of its children, so no symbolic differentiation is needed.
+When the ODE has parameters, coefficients are rational functions of them
+(sympy's polynomial fields) rather than expanded sympy expressions.
+"""
+import collections
+import math
+
+import numpy as np
+import sympy
+from sympy import Derivative, Eq, S, Subs, Symbol
+from sympy.polys.fields import FracElement, sfield
+
+from calc import f_x, x_sym, get_ode_order
+from limits import MEMORY_ERROR_MESSAGE, ResourceLimitError, check_expression_size, record_limit_hit
+
+MAX_SERIES_ORDER = 100
+# Symbolic coefficients grow quickly with the order, computing them is much slower
+MAX_SYMBOLIC_SERIES_ORDER = 30
+
+# Values at x0 of sin, exp... that can become generators of the coefficients' field
+MAX_FIELD_GENERATORS = 20
+
+SeriesSolution = collections.namedtuple("SeriesSolution", ["equation", "coefficients", "x0"])
+
+
+class SeriesError(Exception):
+    pass
+
+
+class _MissingGenerator(Exception):
+    """A value can't be written as a rational function of the field's generators."""
+
+    def __init__(self, expr):
+        super().__init__(str(expr))
+        self.expr = expr
+
+
+# Coefficient arithmetic, either on floats (fast), on rational functions of the parameters
+# (when the ODE has parameters) or, if that fails, on sympy expressions
+
+
+class _Arithmetic:
+    def __init__(self, numeric):
+        self.numeric = numeric
+        if numeric:
+            self.exp, self.sin, self.cos = math.exp, math.sin, math.cos
+            self.sinh, self.cosh, self.log = math.sinh, math.cosh, math.log
+        else:
+            self.exp, self.sin, self.cos = sympy.exp, sympy.sin, sympy.cos
+            self.sinh, self.cosh, self.log = sympy.sinh, sympy.cosh, sympy.log
+
+    def convert(self, value):
+        return float(value) if self.numeric else sympy.sympify(value)
+
+    def clean(self, value):
+        return value if self.numeric else sympy.expand(value)
+
+    def power(self, base, exponent):
+        if self.numeric:
+            return math.pow(base, exponent)
+        return base ** exponent
+
+    def is_zero(self, value):
+        return value == 0
+
+    def to_expr(self, value):
+        return value
+
+
+class _FieldArithmetic(_Arithmetic):
+    """Rational functions of the parameters, constants and values at x0 of sin, exp...
+
+    Much faster than expanding sympy expressions at every step. A value that is
+    not a rational function of the generators raises _MissingGenerator, the
+    computation is then restarted with it as a new generator.
+    """
+
+    def __init__(self, generators):
+        super().__init__(numeric=False)
+        self.generators = list(generators)
+        self.field, _ = sfield(self.generators)
+        self.exp, self.log = self._lift(sympy.exp), self._lift(sympy.log)
+        self.sin, self.cos = self._lift(sympy.sin), self._lift(sympy.cos)
+        self.sinh, self.cosh = self._lift(sympy.sinh), self._lift(sympy.cosh)
+
+    def _lift(self, func):
+        return lambda value: self.convert(func(self.to_expr(value)))
+
+    def convert(self, value):
+        if isinstance(value, FracElement):
+            return value
+        expr = sympy.sympify(value)
+        try:
+            return self.field.from_expr(expr)
+        except ValueError:
+            raise _MissingGenerator(expr)
+
+    def clean(self, value):
+        return value
+
+    def power(self, base, exponent):
+        return self.convert(self.to_expr(base) ** self.to_expr(exponent))
+
+    def to_expr(self, value):
+        return value.as_expr() if isinstance(value, FracElement) else value
+
+
+class _TaylorNode:
+    """Series of a sub-expression of F, coefficients are computed on demand and cached."""
+
+    def __init__(self, arithmetic):
+        self.arithmetic = arithmetic
+        self.coeffs = []
+
+    def coefficient(self, k):
+        while len(self.coeffs) <= k:
+            self.coeffs.append(self.arithmetic.clean(self.next_coefficient(len(self.coeffs))))
+        return self.coeffs[k]
+
+    def next_coefficient(self, k):
+        raise NotImplementedError
+
+
+class _Constant(_TaylorNode):
+    def __init__(self, arithmetic, value):
+        super().__init__(arithmetic)
+        self.value = arithmetic.convert(value)
+
+    def next_coefficient(self, k):
+        return self.value if k == 0 else self.arithmetic.convert(0)
+
+
+class _Variable(_TaylorNode):
+    """x = x0 + t."""
+
+    def __init__(self, arithmetic, x0):
+        super().__init__(arithmetic)
+        self.x0 = arithmetic.convert(x0)
+
+    def next_coefficient(self, k):
+        return self.x0 if k == 0 else self.arithmetic.convert(1 if k == 1 else 0)
+
+
+class _Unknown(_TaylorNode):
+    """j-th derivative of the solution, read from its coefficients a: f^(j) has coefficients a_(k+j) (k+j)!/k!."""
+
+    def __init__(self, arithmetic, solution_coeffs, j):
+        super().__init__(arithmetic)
+        self.solution_coeffs = solution_coeffs
+        self.j = j
+
+    def next_coefficient(self, k):
+        return self.solution_coeffs[k + self.j] * math.prod(range(k + 1, k + self.j + 1))
+
+
+class _Sum(_TaylorNode):
+    def __init__(self, arithmetic, terms):
+        super().__init__(arithmetic)
+        self.terms = terms
+
+    def next_coefficient(self, k):
+        return sum((term.coefficient(k) for term in self.terms[1:]), self.terms[0].coefficient(k))
+
+
+class _Product(_TaylorNode):
+    def __init__(self, arithmetic, a, b):
+        super().__init__(arithmetic)
+        self.a, self.b = a, b
+
+    def next_coefficient(self, k):
+        # Cauchy product
+        return sum((self.a.coefficient(i) * self.b.coefficient(k - i) for i in range(1, k + 1)),
+                   self.a.coefficient(0) * self.b.coefficient(k))
+
+
+class _Power(_TaylorNode):
+    """u^alpha for a constant alpha, u(x0) must be nonzero."""
+
+    def __init__(self, arithmetic, u, alpha):
+        super().__init__(arithmetic)
+        self.u, self.alpha = u, arithmetic.convert(alpha)
+
+    def next_coefficient(self, k):
+        u0 = self.u.coefficient(0)
+        if k == 0:
+            if self.arithmetic.is_zero(u0):
+                raise SeriesError("Une puissance non entière ou négative s'annule au point initial, "
+                                  "la solution n'y est pas développable en série.")
+            return self.arithmetic.power(u0, self.alpha)
+        # p_k = 1/(k u0) sum_{j=1..k} (alpha j - (k - j)) u_j p_(k-j)
+        total = sum(((self.alpha * j - (k - j)) * self.u.coefficient(j) * self.coefficient(k - j)
+                     for j in range(2, k + 1)),
+                    (self.alpha - (k - 1)) * self.u.coefficient(1) * self.coefficient(k - 1))
+        return total / (k * u0)
+
+
+class _Exp(_TaylorNode):
+    def __init__(self, arithmetic, u):
+        super().__init__(arithmetic)
+        self.u = u
+
+    def next_coefficient(self, k):
+        if k == 0:
+            return self.arithmetic.exp(self.u.coefficient(0))
+        # e_k = 1/k sum_{j=1..k} j u_j e_(k-j)
+        return sum((j * self.u.coefficient(j) * self.coefficient(k - j) for j in range(2, k + 1)),
+                   self.u.coefficient(1) * self.coefficient(k - 1)) / k
+
+
+class _Log(_TaylorNode):
+    def __init__(self, arithmetic, u):
+        super().__init__(arithmetic)
+        self.u = u
+
+    def next_coefficient(self, k):
+        u0 = self.u.coefficient(0)
+        if k == 0:
+            if self.arithmetic.is_zero(u0):
+                raise SeriesError("Un logarithme s'annule au point initial, "
+                                  "la solution n'y est pas développable en série.")
+            return self.arithmetic.log(u0)
+        # l_k = (u_k - 1/k sum_{j=1..k-1} j l_j u_(k-j)) / u0
+        total = sum((j * self.coefficient(j) * self.u.coefficient(k - j) for j in range(1, k)),
+                    self.arithmetic.convert(0))
+        return (self.u.coefficient(k) - total / k) / u0
+
+
+class _Trigonometric(_TaylorNode):
+    """sin/cos (sign -1) or sinh/cosh (sign 1) of u, computed together as their recurrences are coupled."""
+
+    def __init__(self, arithmetic, u, hyperbolic, want_sine):
+        super().__init__(arithmetic)
+        self.u = u
+        self.hyperbolic = hyperbolic
+        self.want_sine = want_sine
+        self.sines, self.cosines = [], []
+
+    def next_coefficient(self, k):
+        if k == 0:
+            u0 = self.u.coefficient(0)
+            sine = self.arithmetic.sinh(u0) if self.hyperbolic else self.arithmetic.sin(u0)
+            cosine = self.arithmetic.cosh(u0) if self.hyperbolic else self.arithmetic.cos(u0)
+        else:
+            # s_k = 1/k sum j u_j c_(k-j),  c_k = -+1/k sum j u_j s_(k-j)
+            weights = [j * self.u.coefficient(j) for j in range(1, k + 1)]
+            sine = sum((w * c for w, c in zip(weights, reversed(self.cosines))), self.arithmetic.convert(0)) / k
+            cosine = sum((w * s for w, s in zip(weights, reversed(self.sines))), self.arithmetic.convert(0)) / k
+            if not self.hyperbolic:
+                cosine = -cosine
+        self.sines.append(self.arithmetic.clean(sine))
+        self.cosines.append(self.arithmetic.clean(cosine))
+        return sine if self.want_sine else cosine
+
+
+class _Quotient(_TaylorNode):
+    def __init__(self, arithmetic, a, b):
+        super().__init__(arithmetic)
+        self.a, self.b = a, b
+
+    def next_coefficient(self, k):
+        b0 = self.b.coefficient(0)
+        if self.arithmetic.is_zero(b0):
+            raise SeriesError("Un dénominateur s'annule au point initial, "
+                              "la solution n'y est pas développable en série.")
+        # q_k = (a_k - sum_{j=1..k} b_j q_(k-j)) / b0
+        total = sum((self.b.coefficient(j) * self.coefficient(k - j) for j in range(1, k + 1)),
+                    self.arithmetic.convert(0))
+        return (self.a.coefficient(k) - total) / b0
+
+
+class _TreeBuilder:
+    """Turn F(x, y_0, ..., y_(n-1)) into Taylor nodes."""
+
+    def __init__(self, arithmetic, x0, unknowns, solution_coeffs):
+        self.arithmetic = arithmetic
+        self.x0 = x0
+        self.unknowns = unknowns
+        self.solution_coeffs = solution_coeffs
+        self.dependencies = {x_sym, *unknowns}
+        self.cache = {}
+
+    def build(self, expr):
+        if expr not in self.cache:
+            self.cache[expr] = self._build(expr)
+        return self.cache[expr]
+
+    def _build(self, expr):
+        arithmetic = self.arithmetic
+
+        if not expr.free_symbols & self.dependencies:
+            return _Constant(arithmetic, expr if not arithmetic.numeric else sympy.N(expr))
+        if expr == x_sym:
+            return _Variable(arithmetic, self.x0)
+        if expr in self.unknowns:
+            return _Unknown(arithmetic, self.solution_coeffs, self.unknowns.index(expr))
+
+        if expr.is_Add:
+            return _Sum(arithmetic, [self.build(term) for term in expr.args])
+
+        if expr.is_Mul:
+            numerator, denominator = expr.as_numer_denom()
+            if denominator != 1:
+                return _Quotient(arithmetic, self.build(numerator), self.build(denominator))
+            node = self.build(expr.args[0])
+            for factor in expr.args[1:]:
+                node = _Product(arithmetic, node, self.build(factor))
+            return node
+
+        if expr.is_Pow:
+            base, exponent = expr.args
+            if exponent.free_symbols & self.dependencies:
+                # u^v = exp(v log u)
+                return self.build(sympy.exp(exponent * sympy.log(base), evaluate=False))
+            if exponent.is_Integer and exponent > 0:
+                return self._integer_power(self.build(base), int(exponent))
+            if exponent.is_Integer and exponent < 0:
+                return _Quotient(arithmetic, _Constant(arithmetic, 1), self._integer_power(self.build(base), -int(exponent)))
+            return _Power(arithmetic, self.build(base), exponent if not arithmetic.numeric else sympy.N(exponent))
+
+        if isinstance(expr, sympy.exp):
+            return _Exp(arithmetic, self.build(expr.args[0]))
+        if isinstance(expr, sympy.log) and len(expr.args) == 1:
+            return _Log(arithmetic, self.build(expr.args[0]))
+        if isinstance(expr, (sympy.sin, sympy.cos, sympy.sinh, sympy.cosh)):
+            hyperbolic = isinstance(expr, (sympy.sinh, sympy.cosh))
+            return _Trigonometric(arithmetic, self.build(expr.args[0]), hyperbolic,
+                                  want_sine=isinstance(expr, (sympy.sin, sympy.sinh)))
+        if isinstance(expr, (sympy.tan, sympy.tanh)):
+            sine, cosine = (sympy.sinh, sympy.cosh) if isinstance(expr, sympy.tanh) else (sympy.sin, sympy.cos)
+            u = expr.args[0]
+            return _Quotient(arithmetic, self.build(sine(u)), self.build(cosine(u)))
+
+        raise SeriesError(f"La fonction {expr.func} n'est pas supportée par le développement en série.")
+
+    def _integer_power(self, node, exponent):
+        # Binary exponentiation, works even where the base vanishes
+        result = None
+        while exponent:
+            if exponent & 1:
+                result = node if result is None else _Product(self.arithmetic, result, node)
+            exponent >>= 1
+            if exponent:
+                node = _Product(self.arithmetic, node, node)
+        return result
+
+
+def _initial_values(ics_dict, ode_order):
+    """Extract x0 and the values of f, f', ..., f^(n-1) at x0 from a dict built by prepare_ics_dict."""
+    x0 = None
+    values = {}
+    for condition, value in (ics_dict or {}).items():
+        if isinstance(condition, Subs):
+            order = condition.expr.derivative_count
+            point = condition.point[0]
+        elif condition.func == f_x.func:
+            order = 0
+            point = condition.args[0]
+        else:
+            raise SeriesError(f"Condition initiale non supportée : {condition}")
+
+        if x0 is not None and point != x0:
+            raise SeriesError("Toutes les conditions initiales doivent être données au même point x₀.")
+        x0 = point
+        values[order] = value
+
+    # Missing conditions become constants, like in dsolve's general solutions
+    initial_values = [values.get(i, Symbol(f"C{i + 1}")) for i in range(ode_order)]
+    return (x0 if x0 is not None else sympy.Integer(0)), initial_values
+
+
+def _taylor_coefficients(arithmetic, rhs, x0, unknowns, initial_values, order):
+    """Coefficients a_0..a_order of the solution of f^(n) = rhs, n being the number of unknowns."""
+    ode_order = len(unknowns)
+    solution_coeffs = [arithmetic.convert(value) / math.factorial(i) for i, value in enumerate(initial_values)]
+    rhs_series = _TreeBuilder(arithmetic, x0, unknowns, solution_coeffs).build(rhs)
+
+    # a_(m+n) = F_m m! / (m+n)!
+    for m in range(order - ode_order + 1):
+        solution_coeffs.append(arithmetic.clean(rhs_series.coefficient(m) / math.prod(range(m + 1, m + ode_order + 1))))
+        if not arithmetic.numeric:
+            # Stop as soon as the coefficients are too large to be displayed
+            check_expression_size(arithmetic.to_expr(solution_coeffs[-1]))
+    return [arithmetic.to_expr(c) for c in solution_coeffs[:order + 1]]
+
+
+def _symbolic_taylor_coefficients(rhs, x0, unknowns, initial_values, order, parameters):
+    """Coefficients depending on parameters, computed in a field of rational functions when possible."""
+    generators = [*sorted(parameters, key=str), sympy.sympify(x0), *map(sympy.sympify, initial_values)]
+    for _ in range(MAX_FIELD_GENERATORS):
+        try:
+            return _taylor_coefficients(_FieldArithmetic(generators), rhs, x0, unknowns, initial_values, order)
+        except _MissingGenerator as e:
+            if e.expr in generators:
+                break
+            generators.append(e.expr)
+
+    # Values the field can't represent, the coefficients are expanded sympy expressions instead
+    arithmetic = _Arithmetic(numeric=False)
+    return _taylor_coefficients(arithmetic, rhs, x0, unknowns, initial_values, order)
+
+
+def series_solve(ode_eq, ics_dict, order):
+    """Taylor polynomial of degree order of the solution of ode_eq around the initial point.
+
+    Conditions missing from ics_dict are replaced by constants C1 (f(x0)), C2 (f'(x0))...
+    Raises SeriesError if the ODE can't be expanded.
+    """
+    ode_order = get_ode_order(ode_eq, f_x)
+    if ode_order == 0:
+        raise SeriesError("L'équation ne contient pas de dérivée de f.")
+
+    # Write the ODE as f^(n) = F(x, f, ..., f^(n-1))
+    highest = Derivative(f_x, (x_sym, ode_order))
+    expressions = sympy.solve(ode_eq.lhs - ode_eq.rhs, highest)
+    if not expressions:
+        raise SeriesError("Impossible d'isoler la dérivée d'ordre le plus élevé.")
+    if len(expressions) > 1:
+        raise SeriesError("La dérivée d'ordre le plus élevé n'est pas définie de façon unique.")
+
+    unknowns = [Symbol(f"_y{j}") for j in range(ode_order)]
+    rhs = expressions[0]
+    for j in reversed(range(1, ode_order)):
+        rhs = rhs.subs(Derivative(f_x, (x_sym, j)), unknowns[j])
+    rhs = rhs.subs(f_x, unknowns[0])
+    if rhs.has(Derivative) or rhs.atoms(sympy.core.function.AppliedUndef):
+        raise SeriesError("Seules les équations portant sur f seule sont supportées.")
+
+    x0, initial_values = _initial_values(ics_dict, ode_order)
+
+    parameters = (rhs.free_symbols - {x_sym, *unknowns}) | set().union(
+        *(sympy.sympify(v).free_symbols for v in initial_values))
+    if not parameters and sympy.sympify(x0).is_number:
+        arithmetic = _Arithmetic(numeric=True)
+        coefficients = _taylor_coefficients(arithmetic, rhs, x0, unknowns, initial_values, order)
+    else:
+        if order > MAX_SYMBOLIC_SERIES_ORDER:
+            raise SeriesError(f"Avec des paramètres ou des conditions initiales non précisées, "
+                              f"l'ordre de la série est limité à {MAX_SYMBOLIC_SERIES_ORDER}.")
+        coefficients = _symbolic_taylor_coefficients(rhs, x0, unknowns, initial_values, order, parameters)
+
+    shift = x_sym - x0 if x0 != 0 else x_sym
+    polynomial = sympy.Add(*[_series_term(c, shift, k) for k, c in enumerate(map(sympy.sympify, coefficients)) if c != 0])
+    return SeriesSolution(Eq(f_x, polynomial), coefficients, x0)
+
+
+def _series_term(coefficient, shift, k):
+    if k == 0:
+        return coefficient
+    if coefficient.is_number and coefficient.is_real and abs(float(coefficient)) == 1:
+        # Numeric solutions have float coefficients, 1.0*x is shown as x
+        coefficient = S.One if coefficient > 0 else S.NegativeOne
+    # Kept unevaluated so that (x - x0) is not distributed over the coefficient, nor merged with the constant term
+    return sympy.Mul(coefficient, shift ** k, evaluate=False)
+
+
+def horner_callable(series_solution, constants_values=None):
+    """NumPy function evaluating the Taylor polynomial in Horner form, constants must be given if any."""
+    subs = {Symbol(name): value for name, value in (constants_values or {}).items()}
+    try:
+        coefficients = [float(sympy.sympify(c).subs(subs)) for c in series_solution.coefficients]
+        x0 = float(sympy.sympify(series_solution.x0).subs(subs))
+    except TypeError:
+        raise SeriesError("Les constantes doivent être précisées pour évaluer la série.")
+
+    def evaluate(x_vals):
+        t = np.asarray(x_vals, dtype=float) - x0
+        result = np.zeros_like(t)
+        for c in reversed(coefficients):
+            result = result * t + c
+        return result
+
+    return evaluate
+
+
+def solve_ode_series(ode_eq, ics_dict, order):
+    """Power series approximation of the solution, returns (SeriesSolution, error) like calc.solve_ode."""
+    if not 1 <= order <= MAX_SERIES_ORDER:
+        return None, f"L'ordre de la série doit être compris entre 1 et {MAX_SERIES_ORDER}."
+    try:
+        return series_solve(ode_eq, ics_dict, order), ""
+    except (SeriesError, ResourceLimitError) as e:
+        return None, str(e)
+    except MemoryError:
+        record_limit_hit("memory")
+        return None, MEMORY_ERROR_MESSAGE
+    except (ZeroDivisionError, OverflowError, ValueError) as e:
+        return None, f"Le développement en série a échoué ({e})"
@@ -0,0 +1,203 @@
+"""Compact storage of the sympy objects kept between reruns of each user session.
+
+Objects are stored as compressed pickles, shared across sessions by content
+hash, and only rehydrated when read (with a small cache of recently read
+objects). Sessions that stay idle longer than a configurable delay lose their
+stored objects, which bounds the memory used by abandoned sessions:
+    ODE_SOLVER_SESSION_IDLE_SECONDS  idle delay before eviction, 0 disables it (default 1800)
+"""
+import collections
+import hashlib
+import os
+import pickle
+import threading
+import time
+import zlib
+
+try:
+    SESSION_IDLE_SECONDS = int(os.environ.get("ODE_SOLVER_SESSION_IDLE_SECONDS", 1800))
+except ValueError:
+    SESSION_IDLE_SECONDS = 1800
+
+# Idle sessions are looked for at most this often
+EVICTION_INTERVAL_SECONDS = 60
+
+# Number of rehydrated objects kept alive, across all sessions
+REHYDRATED_CACHE_SIZE = 64
+
+
+def _copy_containers(value):
+    """Copy lists, tuples and dicts so callers can mutate them, sympy objects are immutable and shared."""
+    if isinstance(value, list):
+        return [_copy_containers(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy_containers(item) for key, item in value.items()}
+    if isinstance(value, tuple) and not hasattr(value, "_fields"):
+        return tuple(_copy_containers(item) for item in value)
+    return value
+
+
+def content_hash(value):
+    """Hash of the pickled value, equal for equal sympy objects."""
+    return _hash_pickle(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _hash_pickle(raw):
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class SessionStore:
+    """Content addressed store of serialized objects, indexed by session and key."""
+
+    def __init__(self, idle_seconds=SESSION_IDLE_SECONDS, compress=True):
+        self.idle_seconds = idle_seconds
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._blobs = {}        # content hash -> serialized bytes
+        self._raw_sizes = {}    # content hash -> pickle size before compression
+        self._refcounts = collections.Counter()
+        self._sessions = {}     # session id -> {key: content hash}
+        self._last_access = {}  # session id -> time of the last access
+        self._cleanups = {}     # session id -> {key: callback called when the session is dropped}
+        self._rehydrated = collections.OrderedDict()
+        self._last_eviction = time.monotonic()
+        self.evicted_sessions = 0
+
+    def put(self, session_id, key, value):
+        """Store value under key for the session, replacing the previous value."""
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        content_hash = _hash_pickle(raw)
+
+        with self._lock:
+            self._last_access[session_id] = time.monotonic()
+            entries = self._sessions.setdefault(session_id, {})
+            if entries.get(key) == content_hash:
+                return
+
+            if content_hash not in self._blobs:
+                self._blobs[content_hash] = zlib.compress(raw) if self.compress else raw
+                self._raw_sizes[content_hash] = len(raw)
+            self._refcounts[content_hash] += 1
+
+            previous_hash = entries.get(key)
+            entries[key] = content_hash
+            if previous_hash is not None:
+                self._release(previous_hash)
+
+    def get(self, session_id, key, default=None):
+        """Rehydrate the value stored under key for the session, default if there is none (or it was evicted)."""
+        with self._lock:
+            self._last_access[session_id] = time.monotonic()
+            content_hash = self._sessions.get(session_id, {}).get(key)
+            if content_hash is None:
+                return default
+
+            if content_hash in self._rehydrated:
+                self._rehydrated.move_to_end(content_hash)
+                return _copy_containers(self._rehydrated[content_hash])
+
+            blob = self._blobs[content_hash]
+
+        # Unpickling can be slow, it happens outside the lock
+        value = pickle.loads(zlib.decompress(blob) if self.compress else blob)
+
+        with self._lock:
+            self._rehydrated[content_hash] = value
+            self._rehydrated.move_to_end(content_hash)
+            while len(self._rehydrated) > REHYDRATED_CACHE_SIZE:
+                self._rehydrated.popitem(last=False)
+        return _copy_containers(value)
+
+    def delete(self, session_id, key):
+        with self._lock:
+            content_hash = self._sessions.get(session_id, {}).pop(key, None)
+            if content_hash is not None:
+                self._release(content_hash)
+
+    def set_cleanup(self, session_id, key, callback):
+        """Call callback() when the session is dropped or evicted, replacing the previous callback under key.
+
+        Meant for resources held by the session outside the store, like a running solve job.
+        """
+        with self._lock:
+            self._last_access[session_id] = time.monotonic()
+            self._cleanups.setdefault(session_id, {})[key] = callback
+
+    def drop_session(self, session_id):
+        """Release every object stored for the session."""
+        with self._lock:
+            cleanups = self._drop_session(session_id)
+        _run_cleanups(cleanups)
+
+    def evict_idle_sessions(self, force=False):
+        """Drop the objects of sessions idle for longer than idle_seconds, returns how many were dropped.
+
+        Unless forced, does nothing if the last check was less than EVICTION_INTERVAL_SECONDS ago.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.idle_seconds <= 0 or (not force and now - self._last_eviction < EVICTION_INTERVAL_SECONDS):
+                return 0
+            self._last_eviction = now
+
+            idle_sessions = [session_id for session_id, last_access in self._last_access.items()
+                             if now - last_access > self.idle_seconds]
+            cleanups = []
+            for session_id in idle_sessions:
+                cleanups.extend(self._drop_session(session_id))
+            self.evicted_sessions += len(idle_sessions)
+
+        _run_cleanups(cleanups)
+        return len(idle_sessions)
+
+    def session_footprint(self, session_id):
+        """Memory used by a session's stored objects, shared objects are counted in full."""
+        with self._lock:
+            entries = self._sessions.get(session_id, {})
+            return {
+                "entries": len(entries),
+                "stored_bytes": sum(len(self._blobs[h]) for h in entries.values()),
+                "raw_bytes": sum(self._raw_sizes[h] for h in entries.values()),
+                "shared_entries": sum(self._refcounts[h] > 1 for h in entries.values()),
+                "idle_seconds": round(time.monotonic() - self._last_access.get(session_id, time.monotonic()), 1),
+            }
+
+    def stats(self):
+        """Memory used by the whole store."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "objects": len(self._blobs),
+                "references": sum(self._refcounts.values()),
+                "stored_bytes": sum(len(blob) for blob in self._blobs.values()),
+                "raw_bytes": sum(self._raw_sizes.values()),
+                "rehydrated_cached": len(self._rehydrated),
+                "evicted_sessions": self.evicted_sessions,
+            }
+
+    def _drop_session(self, session_id):
+        """Release the session's objects, returns its cleanup callbacks, to be run outside the lock."""
+        for content_hash in self._sessions.pop(session_id, {}).values():
+            self._release(content_hash)
+        self._last_access.pop(session_id, None)
+        return list(self._cleanups.pop(session_id, {}).values())
+
+    def _release(self, content_hash):
+        self._refcounts[content_hash] -= 1
+        if self._refcounts[content_hash] <= 0:
+            del self._refcounts[content_hash]
+            del self._blobs[content_hash]
+            del self._raw_sizes[content_hash]
+            self._rehydrated.pop(content_hash, None)
+
+
+def _run_cleanups(cleanups):
+    for callback in cleanups:
+        try:
+            callback()
+        except Exception:
+            pass
+
+
+# Shared by every session of the Streamlit server
+session_store = SessionStore()
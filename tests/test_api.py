@@ -0,0 +1,99 @@
+import http.client
+import json
+import math
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from api import create_server
+
+SLOW_EQUATION = "f''''(x) = x^7*f'(x)^3 + exp(f(x))*sin(x)*f''(x)"
+
+
+class ApiTest(unittest.TestCase):
+    """Runs the API on a free localhost port, with a single worker to make timeouts visible."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = create_server(port=0, workers=1, timeout=5)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.server.service.shutdown()
+
+    def request(self, method, path, body=None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.server_port, timeout=60)
+        try:
+            connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                               headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def test_parse(self):
+        status, payload = self.request("POST", "/parse", {"equation": "f'(x) = sin 2x"})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["order"], 1)
+        self.assertIn("sin(2*x)", payload["equation"])
+
+    def test_evaluate(self):
+        status, payload = self.request("POST", "/evaluate", {"expression": "C1*exp(x)", "range": [0, 1],
+                                                             "points": 3, "constants": {"C1": 2}})
+        self.assertEqual(status, 200)
+        self.assertAlmostEqual(payload["y"][0], 2.0)
+
+    def test_evaluate_does_not_run_code(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "created")
+            status, _ = self.request("POST", "/evaluate", {"expression": f"__import__('os').system('touch {path}')"})
+            self.assertEqual(status, 422)
+            self.assertFalse(os.path.exists(path))
+
+    def test_evaluate_rejects_non_expressions(self):
+        for expression in ["[1, 2]", "(1, 2)", "f(x) = x"]:
+            with self.subTest(expression):
+                status, _ = self.request("POST", "/evaluate", {"expression": expression})
+                self.assertEqual(status, 422)
+
+    def test_evaluate_rejects_non_finite_numbers(self):
+        for body in [{"expression": "x", "range": [-math.inf, math.inf]},
+                     {"expression": "C1*x", "constants": {"C1": math.nan}}]:
+            with self.subTest(body):
+                status, _ = self.request("POST", "/evaluate", body)
+                self.assertEqual(status, 400)
+
+    def test_negative_content_length(self):
+        with socket.create_connection(("127.0.0.1", self.server.server_port), timeout=5) as connection:
+            connection.sendall(b"POST /parse HTTP/1.1\r\nHost: localhost\r\nContent-Length: -1\r\n\r\n")
+            self.assertTrue(connection.recv(4096).startswith(b"HTTP/1.1 400"))
+
+    def test_unknown_paths_share_a_metrics_entry(self):
+        for path in ["/unknown-1", "/unknown-2"]:
+            status, _ = self.request("GET", path)
+            self.assertEqual(status, 404)
+        _, metrics = self.request("GET", "/metrics")
+        self.assertIn("GET (inconnu)", metrics["endpoints"])
+        self.assertFalse(any("unknown" in endpoint for endpoint in metrics["endpoints"]))
+
+    def test_timeout_replaces_the_worker(self):
+        status, _ = self.request("POST", "/solve", {"equation": SLOW_EQUATION})
+        self.assertEqual(status, 504)
+
+        # The stuck worker was killed, the next requests get a new one
+        for _ in range(2):
+            status, payload = self.request("POST", "/parse", {"equation": "f'(x) = f(x)"})
+            self.assertEqual(status, 200, payload)
+
+        _, metrics = self.request("GET", "/metrics")
+        self.assertGreaterEqual(metrics["restarted_workers"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import math
+import unittest
+from unittest import mock
+
+import numpy as np
+import sympy
+
+import evaluator
+from evaluator import evaluate_expression
+
+x = sympy.Symbol("x")
+
+
+class EvaluateExpressionTest(unittest.TestCase):
+
+    def test_overflow(self):
+        x_vals = np.linspace(-5, 500, 101)
+        evaluation = evaluate_expression(2 * sympy.exp(3 * x), x, x_vals)
+
+        overflowing = 3 * x_vals > 709
+        self.assertTrue(evaluation.overflowed)
+        self.assertTrue(np.isposinf(evaluation.values[overflowing]).all())
+        np.testing.assert_allclose(evaluation.values[~overflowing], 2 * np.exp(3 * x_vals[~overflowing]), rtol=1e-12)
+        # log10 |2 exp(3x)| = log10(2) + 3x log10(e), defined beyond the float64 range
+        np.testing.assert_allclose(evaluation.log10_abs, math.log10(2) + 3 * x_vals * math.log10(math.e), rtol=1e-12)
+
+    def test_cancellation_is_refined(self):
+        x_vals = np.linspace(20, 40, 21)
+        evaluation = evaluate_expression(sympy.cosh(x) - sympy.sinh(x), x, x_vals)
+
+        self.assertGreater(evaluation.refined_count, 0)
+        self.assertFalse(evaluation.overflowed)
+        np.testing.assert_allclose(evaluation.values, np.exp(-x_vals), rtol=1e-10)
+
+    def test_non_real_values_are_nan(self):
+        x_vals = np.linspace(-1, 1, 21)
+        with mock.patch.object(evaluator, "_mpmath_value") as mpmath_value:
+            evaluation = evaluate_expression(sympy.sqrt(x), x, x_vals)
+        mpmath_value.assert_not_called()
+
+        self.assertEqual(evaluation.refined_count, 0)
+        self.assertTrue(np.isnan(evaluation.values[x_vals < 0]).all())
+        np.testing.assert_allclose(evaluation.values[x_vals >= 0], np.sqrt(x_vals[x_vals >= 0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import unittest
+
+import sympy
+from sympy import Derivative, Eq, Symbol
+
+from benchmark_parser import legacy_parse
+from calc import f_x, get_ode_order, local_dict, parse_ode, x_sym
+from limits import ResourceLimitError, limit_hits_snapshot
+from ode_parser import ParseError, parse_ode_string
+
+# Examples of the README and of show_intructions, and the systems' equations
+EXAMPLES = [
+    "f'(x) = -k*f(x)",
+    "f''(x) + omega^2 * f(x)",
+    "f''(x) + 2 * zeta * omega * f'(x) + omega^2 * f(x)",
+    "f''(x) + 2 * zeta * omega * f'(x) + omega^2 * f(x) = F0 * cos(Omega * x)",
+    "f'(x) = -rho * f(x)",
+    "f''(x) - mu * (1 - f(x)**2) * f'(x) + f(x)",
+    "f'(x) + 2*f(x)/x = f(x)^3",
+    "f'(x) = f(x)^2 + f(x) + 1",
+    "f'(x) = f(x)",
+    "g'(x) = f(x) + g(x)",
+    "f'(x) = 3*f(x) + g(x)",
+    "g'(x) = f(x) + 3*g(x)",
+    "f'''(x) = f(x)",
+    "f^(3)(x) = f(x)",
+    "f(3)(x) = f(x)",
+    "f3(x) = f(x)",
+    "Derivative(f(x), (x, 3)) = f(x)",
+]
+
+# Examples using a function letter as a constant (g, r), which the previous parser rejected
+m, g, r, K, L, gamma = sympy.symbols("m g r K L gamma")
+CONSTANT_LETTER_EXAMPLES = {
+    "m * f''(x) = -mg - gamma * f'(x)": Eq(m * Derivative(f_x, (x_sym, 2)), -m * g - gamma * Derivative(f_x, x_sym)),
+    "f'(x) = r * f(x) * (1 - f(x)/K)": Eq(Derivative(f_x, x_sym), r * f_x * (1 - f_x / K)),
+    "f''(x) + (g/L) * sin(f(x))": Eq(Derivative(f_x, (x_sym, 2)) + g / L * sympy.sin(f_x), 0),
+}
+
+# Forms the previous parser handled, that must give the same result
+LEGACY_CASES = [
+    "f'(x) = abs(x)",
+    "f'(x) = Integer(2)*f(x)",
+    "f'(x) = pow(x, 2)",
+    "f'(x) = N(pi)*f(x)",
+    "f'(x) = max(x, 1)",
+    "f'(x) = min(x, 1) + Rational(1, 3)",
+    "f'(x) = sin 2x",
+    "f'(x) = sin omega x + 1",
+    "f'(x) = sin(x)/2",
+    "f''(x) + k f(x) = 0",
+    "f''(x) + kf(x) = 0",
+    "f'(x) = tanh(x) + sinh(x)",
+    "f'(x) = exp(-x) f(x)",
+    "f'(x) = 2x f(x)",
+]
+
+
+class LegacyComparisonTest(unittest.TestCase):
+
+    def assert_same_as_legacy(self, ode_string):
+        ode_eq, _, error = parse_ode(ode_string)
+        self.assertEqual(error, "")
+        expected = legacy_parse(ode_string)
+        if not isinstance(expected, Eq):
+            expected = Eq(expected, 0)
+        self.assertEqual(ode_eq, expected)
+
+    def test_examples(self):
+        for ode_string in EXAMPLES:
+            with self.subTest(ode_string):
+                self.assert_same_as_legacy(ode_string)
+
+    def test_constant_letter_examples(self):
+        for ode_string, expected in CONSTANT_LETTER_EXAMPLES.items():
+            with self.subTest(ode_string):
+                self.assertEqual(parse_ode(ode_string), (expected, get_ode_order(expected, f_x), ""))
+
+    def test_legacy_cases(self):
+        for ode_string in LEGACY_CASES:
+            with self.subTest(ode_string):
+                self.assert_same_as_legacy(ode_string)
+
+    def test_orders(self):
+        for ode_string, order in [("f'(x) = f(x)", 1), ("f''(x) + f(x)", 2), ("f^(4)(x) = x", 4), ("f5(x) = 0", 5)]:
+            with self.subTest(ode_string):
+                self.assertEqual(parse_ode(ode_string)[1], order)
+
+
+class ParserTest(unittest.TestCase):
+
+    def parse(self, text):
+        return parse_ode_string(text, local_dict)
+
+    def test_implicit_application_spans_the_juxtaposition(self):
+        self.assertEqual(self.parse("sin 2x"), sympy.sin(2 * x_sym))
+        self.assertEqual(self.parse("sin 2x + 1"), sympy.sin(2 * x_sym) + 1)
+        self.assertEqual(self.parse("sin x / 2"), sympy.sin(x_sym) / 2)
+
+    def test_power_of_function(self):
+        self.assertEqual(self.parse("sin^2(x)"), sympy.sin(x_sym) ** 2)
+
+    def test_split_names(self):
+        self.assertEqual(self.parse("-mg"), -m * g)
+        self.assertEqual(self.parse("2 kf'(x)"), 2 * Symbol("k") * Derivative(f_x, x_sym))
+
+    def test_whitelisted_functions(self):
+        self.assertEqual(self.parse("abs(x)"), sympy.Abs(x_sym))
+        self.assertEqual(self.parse("max(x, 1)"), sympy.Max(x_sym, 1))
+        self.assertEqual(self.parse("Rational(1, 3)"), sympy.Rational(1, 3))
+
+    def test_diff_and_integrate_stay_unevaluated(self):
+        self.assertEqual(self.parse("diff(x**2, x)"), Derivative(x_sym ** 2, x_sym))
+        self.assertEqual(self.parse("integrate(x, x)"), sympy.Integral(x_sym, x_sym))
+
+    def test_y_is_a_function_letter(self):
+        y = sympy.Function("y")
+        self.assertEqual(self.parse("y'(x)"), Derivative(y(x_sym), x_sym))
+
+    def test_single_letter_names_are_symbols_unless_called(self):
+        self.assertEqual(self.parse("f(x)/N"), f_x / Symbol("N"))
+
+
+class ParseErrorTest(unittest.TestCase):
+
+    def assert_error_at(self, text, position):
+        with self.assertRaises(ParseError) as context:
+            parse_ode_string(text, local_dict)
+        self.assertEqual(context.exception.position, position)
+
+    def test_positions(self):
+        self.assert_error_at("", 0)
+        self.assert_error_at("f'(x) = f(x) $ 2", 13)
+        self.assert_error_at("f'(x) = (f(x) + 1", 17)
+        self.assert_error_at("f'(x) = f(x) = x", 13)
+        self.assert_error_at("f'(x) = 2 +", 11)
+        self.assert_error_at("f'(x) = 1 + (x, 2)", 10)
+
+    def test_unknown_functions(self):
+        self.assert_error_at("f'(x) = foo(x)", 8)
+        self.assert_error_at("f'(x) = 2*cost(x)", 10)
+
+    def test_computing_functions_are_rejected(self):
+        for name in ["expand", "simplify", "factor", "Sum", "Product"]:
+            with self.subTest(name):
+                self.assert_error_at(f"f'(x) = {name}((x + 1)^2)", 8)
+        self.assert_error_at("f'(x) = N(pi, 1000)", 8)
+
+    def test_parse_ode_reports_position(self):
+        _, _, error = parse_ode("f'(x) = f(x) $ 2")
+        self.assertIn("position 14", error)
+
+
+class ResourceLimitTest(unittest.TestCase):
+    """Parsing runs in the interface process, huge numbers must be refused before sympy computes them."""
+
+    def assert_refused(self, text):
+        hits = limit_hits_snapshot().get("number_size", 0)
+        with self.assertRaises(ResourceLimitError):
+            parse_ode_string(text, local_dict)
+        self.assertEqual(limit_hits_snapshot()["number_size"], hits + 1)
+
+    def test_huge_powers(self):
+        for text in ["9^9^9", "2^40000", "(1/3)^-100000", "2^(10^9/3)", "pow(9, 9^9)", "sqrt(10^999 + 1)"]:
+            with self.subTest(text):
+                self.assert_refused(text)
+
+    def test_functions_of_huge_numbers(self):
+        for text in ["factorial(10^6)", "binomial(10^6, 5)", "log(10^999 + 1)"]:
+            with self.subTest(text):
+                self.assert_refused(text)
+
+    def test_reasonable_numbers(self):
+        self.assertEqual(self.parse("2^100 + factorial(10) + 9.0^(10^9)"),
+                         2 ** 100 + 3628800 + sympy.Float(9) ** 10 ** 9)
+        self.assertEqual(self.parse("x^(10^9)"), x_sym ** 10 ** 9)
+
+    def test_parse_ode_reports_limits(self):
+        _, _, error = parse_ode("f'(x) = 9^9^9")
+        self.assertIn("trop grand", error)
+        _, _, error = parse_ode("f'(x) = " + " + ".join(f"x^{i}" for i in range(6000)))
+        self.assertIn("trop grande", error)
+
+    def parse(self, text):
+        return parse_ode_string(text, local_dict)
+
+
+if __name__ == "__main__":
+    unittest.main()
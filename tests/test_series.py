@@ -0,0 +1,117 @@
+import math
+import unittest
+
+import numpy as np
+import sympy
+from sympy import Symbol
+
+from calc import f_x, parse_ode, prepare_ics_dict, x_sym
+from series import SeriesError, horner_callable, series_solve, solve_ode_series
+
+C1, C2, k = sympy.symbols("C1 C2 k")
+
+
+def ics(*values, x0=0.0):
+    """Initial conditions f(x0), f'(x0)... in the format of the interface."""
+    return prepare_ics_dict(True, {i: {"x0": x0, "y0": value} for i, value in enumerate(values)})
+
+
+def taylor_coefficients(expr, x0, order):
+    """Taylor coefficients of a closed form, computed by sympy."""
+    t = Symbol("t")
+    polynomial = sympy.series(expr.subs(x_sym, t + x0), t, 0, order + 1).removeO()
+    return [float(polynomial.coeff(t, n)) for n in range(order + 1)]
+
+
+class ClosedFormTest(unittest.TestCase):
+    """The numeric recurrences against the Taylor coefficients of known solutions."""
+
+    def assert_series(self, ode_string, ics_dict, closed_form, order=8, x0=0):
+        solution = series_solve(parse_ode(ode_string)[0], ics_dict, order)
+        np.testing.assert_allclose([float(c) for c in solution.coefficients],
+                                   taylor_coefficients(closed_form, x0, order), rtol=1e-12, atol=1e-15)
+        self.assertEqual(float(solution.x0), x0)
+
+    def test_exp(self):
+        self.assert_series("f'(x) = f(x)", ics(1.0), sympy.exp(x_sym))
+
+    def test_sec_from_tan(self):
+        # sec' = sec tan, with tan = sin/cos expanded as a quotient
+        self.assert_series("f'(x) = f(x)*tan(x)", ics(1.0), sympy.sec(x_sym))
+
+    def test_sqrt_from_quotient(self):
+        self.assert_series("f(x)*f'(x) = 1", ics(1.0), sympy.sqrt(1 + 2 * x_sym))
+
+    def test_fractional_power(self):
+        self.assert_series("f'(x) = sqrt(f(x))", ics(1.0), (1 + x_sym / 2) ** 2)
+
+    def test_second_order(self):
+        self.assert_series("f''(x) = -f(x)", ics(0.0, 1.0), sympy.sin(x_sym))
+        self.assert_series("f''(x) = f(x)", ics(1.0, 0.0), sympy.cosh(x_sym))
+
+    def test_around_x0(self):
+        self.assert_series("f'(x) = f(x)", ics(1.0, x0=1.0), sympy.exp(x_sym - 1), x0=1)
+        self.assert_series("f'(x) = log(x)", ics(0.0, x0=1.0), x_sym * sympy.log(x_sym) - x_sym + 1, x0=1)
+
+    def test_horner_callable(self):
+        solution = series_solve(parse_ode("f'(x) = f(x)")[0], ics(1.0, x0=1.0), 12)
+        x_vals = np.linspace(0.5, 1.5, 11)
+        np.testing.assert_allclose(horner_callable(solution)(x_vals), np.exp(x_vals - 1), rtol=1e-9)
+
+
+class SymbolicSeriesTest(unittest.TestCase):
+
+    def test_missing_conditions_become_constants(self):
+        solution = series_solve(parse_ode("f''(x) = -f(x)")[0], {}, 4)
+        self.assertEqual(solution.coefficients, [C1, C2, -C1 / 2, -C2 / 6, C1 / 24])
+
+    def test_parameters(self):
+        solution = series_solve(parse_ode("f'(x) = k*f(x)")[0], {}, 5)
+        expected = [C1 * k ** n / math.factorial(n) for n in range(6)]
+        self.assertEqual([sympy.simplify(c - e) for c, e in zip(solution.coefficients, expected)], [0] * 6)
+
+    def test_constant_horner_callable(self):
+        solution = series_solve(parse_ode("f'(x) = f(x)")[0], {}, 10)
+        np.testing.assert_allclose(horner_callable(solution, {"C1": 2.0})(np.array([0.0, 0.5])),
+                                   [2.0, 2 * math.exp(0.5)], rtol=1e-6)
+        with self.assertRaises(SeriesError):
+            horner_callable(solution)
+
+
+class DisplayTest(unittest.TestCase):
+
+    def test_unit_terms_stay_apart(self):
+        solution = series_solve(parse_ode("f'(x) = f(x)")[0], ics(1.0, x0=1.0), 2)
+        self.assertEqual(str(solution.equation.rhs), "0.5*(x - 1.0)**2 + (x - 1.0) + 1.0")
+        self.assertEqual(solution.equation.lhs, f_x)
+
+    def test_negative_unit_terms(self):
+        solution = series_solve(parse_ode("f'(x) = -f(x)")[0], ics(1.0), 2)
+        self.assertEqual(str(solution.equation.rhs), "0.5*x**2 - x + 1.0")
+
+
+class SeriesErrorTest(unittest.TestCase):
+
+    def assert_error(self, ode_string, ics_dict, message):
+        solution, error = solve_ode_series(parse_ode(ode_string)[0], ics_dict, 5)
+        self.assertIsNone(solution)
+        self.assertIn(message, error)
+
+    def test_pole_at_x0(self):
+        self.assert_error("f'(x) = f(x)/x", ics(1.0), "dénominateur s'annule")
+        self.assert_error("f'(x) = 1/x", ics(1.0), "dénominateur s'annule")
+
+    def test_unsupported_function(self):
+        self.assert_error("f'(x) = abs(f(x))", ics(1.0), "Abs n'est pas supportée")
+
+    def test_non_unique_highest_derivative(self):
+        self.assert_error("f'(x)^2 = f(x)", ics(1.0), "pas définie de façon unique")
+
+    def test_order_bounds(self):
+        solution, error = solve_ode_series(parse_ode("f'(x) = f(x)")[0], ics(1.0), 0)
+        self.assertIsNone(solution)
+        self.assertIn("ordre", error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from unittest import mock
+
+import sympy
+
+import session_store
+from session_store import SessionStore
+
+x = sympy.Symbol("x")
+
+
+class SessionStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = SessionStore(idle_seconds=60)
+
+    def test_round_trip(self):
+        value = [sympy.Eq(sympy.Function("f")(x), sympy.exp(x)), {"order": 1}]
+        self.store.put("a", "solution", value)
+        self.assertEqual(self.store.get("a", "solution"), value)
+        self.assertEqual(self.store.get("a", "missing", "default"), "default")
+
+        # Containers are copies, mutating them doesn't change the stored value
+        self.store.get("a", "solution").append("mutated")
+        self.assertEqual(self.store.get("a", "solution"), value)
+
+    def test_shared_across_sessions(self):
+        self.store.put("a", "solution", sympy.sin(x))
+        self.store.put("b", "solution", sympy.sin(x))
+        self.store.put("b", "other", sympy.sin(x))
+        self.assertEqual(self.store.stats()["objects"], 1)
+        self.assertEqual(self.store.stats()["references"], 3)
+        self.assertEqual(self.store.session_footprint("a")["shared_entries"], 1)
+
+        self.store.drop_session("b")
+        self.assertEqual(self.store.stats()["references"], 1)
+        self.assertEqual(self.store.get("a", "solution"), sympy.sin(x))
+
+        self.store.delete("a", "solution")
+        self.assertEqual(self.store.stats()["objects"], 0)
+
+    def test_replace_releases_previous(self):
+        self.store.put("a", "solution", sympy.sin(x))
+        self.store.get("a", "solution")
+        self.store.put("a", "solution", sympy.cos(x))
+
+        stats = self.store.stats()
+        self.assertEqual((stats["objects"], stats["references"], stats["rehydrated_cached"]), (1, 1, 0))
+        self.assertEqual(self.store.get("a", "solution"), sympy.cos(x))
+
+        # Storing the same value again keeps a single reference
+        self.store.put("a", "solution", sympy.cos(x))
+        self.assertEqual(self.store.stats()["references"], 1)
+
+    def test_evict_idle_sessions(self):
+        now = 1000.0
+        with mock.patch.object(session_store.time, "monotonic", lambda: now):
+            store = SessionStore(idle_seconds=10)
+            store.put("idle", "solution", sympy.sin(x))
+            store.put("active", "solution", sympy.cos(x))
+
+            now += 11
+            store.get("active", "solution")
+            # Not forced, the last check is too recent
+            self.assertEqual(store.evict_idle_sessions(), 0)
+            self.assertEqual(store.evict_idle_sessions(force=True), 1)
+
+            self.assertIsNone(store.get("idle", "solution"))
+            self.assertEqual(store.get("idle", "solution", "default"), "default")
+            self.assertEqual(store.get("active", "solution"), sympy.cos(x))
+            self.assertEqual(store.stats()["evicted_sessions"], 1)
+            self.assertEqual(store.stats()["objects"], 1)
+
+    def test_eviction_disabled(self):
+        store = SessionStore(idle_seconds=0)
+        store.put("a", "solution", sympy.sin(x))
+        self.assertEqual(store.evict_idle_sessions(force=True), 0)
+        self.assertEqual(store.get("a", "solution"), sympy.sin(x))
+
+    def test_cleanups_run_on_eviction(self):
+        now = 1000.0
+        with mock.patch.object(session_store.time, "monotonic", lambda: now):
+            store = SessionStore(idle_seconds=60)
+            cleanup, replaced = mock.Mock(), mock.Mock()
+            store.set_cleanup("a", "job", replaced)
+            store.set_cleanup("a", "job", cleanup)
+            store.set_cleanup("a", "failing", mock.Mock(side_effect=RuntimeError))
+
+            now += 61
+            self.assertEqual(store.evict_idle_sessions(force=True), 1)
+        cleanup.assert_called_once_with()
+        replaced.assert_not_called()
+
+    def test_uncompressed(self):
+        store = SessionStore(compress=False)
+        store.put("a", "solution", sympy.sin(x))
+        self.assertEqual(store.stats()["stored_bytes"], store.stats()["raw_bytes"])
+        self.assertEqual(store.get("a", "solution"), sympy.sin(x))
+
+
+if __name__ == "__main__":
+    unittest.main()
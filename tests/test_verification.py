@@ -0,0 +1,56 @@
+import unittest
+
+import sympy
+from sympy import Eq
+
+from calc import f_x, parse_ode, prepare_ics_dict, solve_ode
+from series import series_solve
+from verification import (VERIFICATION_CACHE_SIZE, cache_verification, cached_verification, verify_series_solution,
+                          verify_solution)
+
+
+class VerifySolutionTest(unittest.TestCase):
+
+    def test_exact_solution(self):
+        ode_eq = parse_ode("f''(x) + f(x) = 0")[0]
+        verification, reason = verify_solution((ode_eq,), (solve_ode(ode_eq)[0],))
+        self.assertEqual((verification.status, reason), ("verified", ""))
+
+    def test_wrong_solution(self):
+        ode_eq = parse_ode("f'(x) = f(x)")[0]
+        verification, _ = verify_solution((ode_eq,), (Eq(f_x, sympy.sin(sympy.Symbol("x"))),))
+        self.assertEqual(verification.status, "failed")
+
+
+class VerifySeriesSolutionTest(unittest.TestCase):
+
+    def verify(self, ode_string, order, x0=0.0):
+        ode_eq = parse_ode(ode_string)[0]
+        ics = prepare_ics_dict(True, {0: {"x0": x0, "y0": 1.0}, 1: {"x0": x0, "y0": 0.0}})
+        solution = series_solve(ode_eq, ics, order)
+        return verify_series_solution((ode_eq,), (solution.equation,), solution.x0, order)
+
+    def test_low_orders_are_approximate(self):
+        # A correct truncation is never reported as false, even at order 1
+        for ode_string in ["f'(x) = f(x)", "f''(x) + 9.81*sin(f(x))"]:
+            for order in [1, 2, 3]:
+                with self.subTest(ode_string, order=order):
+                    self.assertEqual(self.verify(ode_string, order)[0].status, "approximate")
+
+    def test_higher_order_around_x0(self):
+        verification, _ = self.verify("f'(x) = f(x)", 10, x0=2.0)
+        self.assertEqual(verification.status, "approximate")
+        self.assertLess(verification.relative_residual, 1e-10)
+
+
+class VerificationCacheTest(unittest.TestCase):
+
+    def test_bounded(self):
+        for i in range(VERIFICATION_CACHE_SIZE + 1):
+            cache_verification(("test", i), (None, ""))
+        self.assertIsNone(cached_verification(("test", 0)))
+        self.assertEqual(cached_verification(("test", VERIFICATION_CACHE_SIZE)), (None, ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,8 +2,15 @@ import pyperclip
 import streamlit as st
 import sympy
 import urllib.parse
-
-from calc import parse_ode, x_sym, f_x, prepare_ics_dict, solve_ode, get_solution_rhs, compute_nth_derivative
+import uuid
+
+from calc import parse_ode, x_sym, f_x, prepare_ics_dict, solve_ode, solve_ode_system, get_solution_rhs, compute_nth_derivative
+from jobs import SolveJob
+from series import MAX_SERIES_ORDER, SeriesError, SeriesSolution, horner_callable, solve_ode_series
+from verification import (SERIES_CHECK_RADIUS, VERIFICATION_JOB_SECONDS, Verification, verify_solution,
+                          verify_series_solution, check_solution_symbolically, cached_verification, cache_verification)
+from session_store import content_hash, session_store
+from limits import ResourceLimitError, MAX_SYSTEM_SIZE, check_expression_size, check_system_size
 from plotter import *
 from utils import *
 
@@ -15,17 +22,23 @@ def setup_page():
 
 
 def initialize_session_state():
-    """Initialize the session state variables."""
+    """Initialize the session state variables.
+
+    The sympy objects of the session (ode_eq, solution, solved_equations) are kept in
+    the session store rather than in st.session_state, see get_stored. system_funcs
+    stays in st.session_state, it is small and must not be evicted apart from
+    system_equations.
+    """
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
     if 'ode_string' not in st.session_state:
         st.session_state.ode_string = "f'(x) - 3*f(x) = cos(x)"
+    if 'system_funcs' not in st.session_state:
+        st.session_state.system_funcs = []
     if 'ode_parsed_successfully' not in st.session_state:
         st.session_state.ode_parsed_successfully = True
-    if 'ode_eq' not in st.session_state:
-        st.session_state.ode_eq = None
     if 'ode_order' not in st.session_state:
         st.session_state.ode_order = 0
-    if 'solution' not in st.session_state:
-        st.session_state.solution = None
     if 'ics_values' not in st.session_state:
         st.session_state.ics_values = {}
     if 'use_ics' not in st.session_state:
@@ -34,14 +47,55 @@ def initialize_session_state():
         st.session_state.is_system = False
     if 'system_equations' not in st.session_state:
         st.session_state.system_equations = []
-    if 'system_funcs' not in st.session_state:
-        st.session_state.system_funcs = []
     if 'use_other_mod_for_solution_display' not in st.session_state:
         st.session_state.use_other_mod_for_solution_display = False
     if 'current_plot_range' not in st.session_state:
         st.session_state.current_plot_range = (-5, 5)
     if 'current_constants_values' not in st.session_state:
         st.session_state.current_constants_values = {}
+    if 'solve_job' not in st.session_state:
+        st.session_state.solve_job = None
+    if 'symbolic_check_job' not in st.session_state:
+        st.session_state.symbolic_check_job = None
+    if 'verification_jobs' not in st.session_state:
+        st.session_state.verification_jobs = {}
+    if 'use_series' not in st.session_state:
+        st.session_state.use_series = False
+    if 'series_order' not in st.session_state:
+        st.session_state.series_order = 10
+
+    # Release the objects of sessions nobody has used for a while
+    session_store.evict_idle_sessions()
+
+
+def get_stored(key, default=None):
+    """Read an object of the session from the session store."""
+    return session_store.get(st.session_state.session_id, key, default)
+
+
+def set_stored(key, value):
+    """Keep an object of the session in the session store, serialized."""
+    session_store.put(st.session_state.session_id, key, value)
+
+
+def set_solution(solution, solved_equations, series_solution=None):
+    """Store a new solution with the equations it solves, and forget the widgets of the previous one's constants."""
+    for key in [key for key in st.session_state if str(key).startswith("const_")]:
+        del st.session_state[key]
+    set_stored("solution", solution)
+    set_stored("solved_equations", solved_equations)
+    set_stored("series_solution", series_solution)
+
+
+def series_evaluator(solution, constants_values=None):
+    """Horner form NumPy function of a series solution, None for other solutions."""
+    series_solution = get_stored("series_solution")
+    if series_solution is None or series_solution.equation != solution:
+        return None
+    try:
+        return horner_callable(series_solution, constants_values)
+    except SeriesError:
+        return None
 
 
 def render_equation_input():
@@ -56,21 +110,17 @@ def render_equation_input():
 
     ode_eq, ode_order, error_message = parse_ode(st.session_state.ode_string)
 
-    st.session_state.ode_eq = ode_eq
+    set_stored("ode_eq", ode_eq)
 
     if error_message:
         st.sidebar.error(error_message)
         st.session_state.ode_parsed_successfully = False
-        st.session_state.ode_eq = None
+        set_stored("ode_eq", None)
         st.session_state.ode_order = 0
     else:
         st.session_state.ode_parsed_successfully = True
         st.session_state.ode_order = ode_order
-        try:
-            st.sidebar.latex(sympy.latex(st.session_state.ode_eq))
-        except Exception as e:
-            st.sidebar.warning(f"Échec du rendu LaTeX : {e}")
-            st.sidebar.text(str(st.session_state.ode_eq))
+        render_latex(st.sidebar, ode_eq)
 
     return ode_eq, ode_order
 
@@ -110,6 +160,27 @@ def render_initial_conditions():
     return st.session_state.use_ics, st.session_state.ics_values
 
 
+def render_series_options():
+    """Render the power series approximation options."""
+    if st.session_state.ode_order > 0:
+        st.session_state.use_series = st.sidebar.toggle(
+            "Approximation en série entière",
+            value=st.session_state.use_series,
+            help="Calcule le développement de Taylor de la solution autour de x₀, "
+                 "utile pour les équations non linéaires que SymPy ne sait pas résoudre."
+        )
+
+        if st.session_state.use_series:
+            st.session_state.series_order = st.sidebar.number_input(
+                "Ordre de la série", min_value=1, max_value=MAX_SERIES_ORDER,
+                value=st.session_state.series_order, step=1
+            )
+    else:
+        st.session_state.use_series = False
+
+    return st.session_state.use_series, st.session_state.series_order
+
+
 def render_system_input():
     """Render the system of ODEs input section."""
     st.sidebar.header("Système d'EDO")
@@ -130,11 +201,7 @@ def render_system_input():
             if error_message:
                 st.sidebar.error(error_message)
             else:
-                try:
-                    st.sidebar.latex(sympy.latex(ode_eq))
-                except Exception as e:
-                    st.sidebar.warning(f"Échec du rendu LaTeX : {e}")
-                    st.sidebar.text(str(ode_eq))
+                render_latex(st.sidebar, ode_eq)
 
             st.session_state.system_equations[i] = updated_eq
         with cols[1]:
@@ -144,7 +211,8 @@ def render_system_input():
                 st.rerun()
 
     # Add new equation button
-    if st.sidebar.button("Ajouter une équation", use_container_width=True):
+    system_is_full = 0 < MAX_SYSTEM_SIZE <= len(st.session_state.system_equations)
+    if st.sidebar.button("Ajouter une équation", use_container_width=True, disabled=system_is_full):
         # Generate next function name (g, h, p, q, etc. after f)
         func_names = ['f', 'g', 'h', 'p', 'q', 'r', 's', 't']
         next_idx = len(st.session_state.system_funcs)
@@ -164,7 +232,7 @@ def render_system_input():
 
 def render_solve_button():
     """Render the solve button and handle solving."""
-    ode_ready_to_be_solved = (st.session_state.ode_eq is not None
+    ode_ready_to_be_solved = (get_stored("ode_eq") is not None
                               and st.session_state.ode_parsed_successfully
                               and st.session_state.ode_order > 0)
 
@@ -176,7 +244,7 @@ def render_solve_button():
     if system_button:
         st.session_state.is_system = True
         # Add the first equation to the system
-        if st.session_state.ode_eq is not None:
+        if get_stored("ode_eq") is not None:
             st.session_state.system_equations = [st.session_state.ode_string]
             st.session_state.system_funcs = [f_x]  # Start with f(x)
         st.session_state.use_other_mod_for_solution_display = True
@@ -189,8 +257,8 @@ def render_solve_button():
 
 def render_solve_system_button():
     """Render the solve button and handle solving, for systems."""
-    ode_ready_to_be_solved = (st.session_state.ode_eq is not None
-                              and st.session_state.ode_parsed_successfully
+    # The equations are parsed again by solve_system, the stored ode_eq may have been evicted
+    ode_ready_to_be_solved = (st.session_state.ode_parsed_successfully
                               and len(st.session_state.system_equations) > 1)
 
     solve_button = st.sidebar.button(":material/calculate: Résoudre", type="primary", use_container_width=True,
@@ -212,51 +280,104 @@ def render_solve_system_button():
 
 
 def solve_single_ode():
-    """Solve a single ODE."""
-    ode_ready_to_be_solved = st.session_state.ode_eq is not None and st.session_state.ode_parsed_successfully
+    """Submit a single ODE to be solved in the background."""
+    ode_eq = get_stored("ode_eq")
+    ode_ready_to_be_solved = ode_eq is not None and st.session_state.ode_parsed_successfully
 
     if ode_ready_to_be_solved:
         ics_dict = prepare_ics_dict(st.session_state.use_ics, st.session_state.ics_values)
-
-        with st.spinner("Chargement..."):
-            solution, error = solve_ode(st.session_state.ode_eq, ics_dict)
-
-        if error:
-            st.error(error)
-            st.session_state.solution = error
+        if st.session_state.use_series:
+            start_solve_job(SolveJob(solve_ode_series, ode_eq, ics_dict,
+                                     st.session_state.series_order, label="Calcul de la série..."), (ode_eq,))
         else:
-            st.session_state.solution = solution
+            start_solve_job(SolveJob(solve_ode, ode_eq, ics_dict, label="Chargement..."), (ode_eq,))
     else:
         show_error("Entrez une EDO valide avant de résoudre.", "ode_ready_to_be_solved is False", "solve_single_ode")
 
 
 def solve_system():
-    """Solve a system of ODEs."""
+    """Submit a system of ODEs to be solved in the background."""
     try:
-        # Parse all equations in the system
-        system_eqs = []
-        for eq_str in st.session_state.system_equations:
-            eq, _, error = parse_ode(eq_str)
-            if error:
-                show_error(f"Erreur dans l'équation: {eq_str}", error, "solve_system")
-                return
-            system_eqs.append(eq)
-
-        # Build the function list
-        func_list = st.session_state.system_funcs
-
-        with st.spinner("Résolution du système..."):
-            solution = sympy.solvers.ode.systems.dsolve_system(system_eqs, func_list)
-            st.session_state.solution = solution
-
-    except Exception as e:
-        show_error(f"Erreur lors de la résolution du système", e, "solve_system")
-        st.session_state.solution = f"Erreur: {e}"
+        check_system_size(len(st.session_state.system_equations))
+    except ResourceLimitError as e:
+        show_error(str(e), e.limit, "solve_system")
+        return
+
+    # Parse all equations in the system
+    system_eqs = []
+    for eq_str in st.session_state.system_equations:
+        eq, _, error = parse_ode(eq_str)
+        if error:
+            show_error(f"Erreur dans l'équation: {eq_str}", error, "solve_system")
+            return
+        system_eqs.append(eq)
+
+    # Build the function list
+    func_list = st.session_state.system_funcs
+
+    start_solve_job(SolveJob(solve_ode_system, system_eqs, func_list, label="Résolution du système..."),
+                    tuple(system_eqs))
+
+
+def start_solve_job(job, equations):
+    """Store a new solve job in the session, replacing (and killing) any running one.
+
+    equations are the equations being solved, they are stored with the solution once the job is over.
+    """
+    if st.session_state.solve_job is not None:
+        st.session_state.solve_job.cancel()
+    st.session_state.solve_job = job
+    set_stored("solve_job_equations", equations)
+    kill_on_eviction("solve_job", [job])
+
+
+def kill_on_eviction(name, jobs):
+    """Kill the jobs when the session is evicted, as nobody polls them anymore. Replaces the jobs given under name."""
+    def kill_jobs():
+        for job in list(jobs):
+            job.kill("Arrêté, la session était inactive.")
+
+    session_store.set_cleanup(st.session_state.session_id, name, kill_jobs)
+
+
+def render_solve_job():
+    """Render the progress of the running solve job and symbolic check, if any."""
+    if st.session_state.solve_job is not None:
+        solve_job_progress()
+    if st.session_state.symbolic_check_job is not None:
+        symbolic_check_progress()
+
+
+@st.fragment(run_every=0.5)
+def solve_job_progress():
+    """Poll the running solve job, and store its result once it is over."""
+    job = st.session_state.solve_job
+    if job is None:
+        return
+
+    if job.poll():
+        solution, error = job.result()
+        series_solution = None
+        if isinstance(solution, SeriesSolution):
+            series_solution, solution = solution, solution.equation
+        # Errors are stored as strings, display_solution reports them
+        set_solution(error if error else solution, get_stored("solve_job_equations"), series_solution)
+        st.session_state.solve_job = None
+        st.rerun(scope="app")
+
+    status_col, button_col = st.columns([8, 1], vertical_alignment="center")
+    with status_col:
+        st.info(f"{job.label} ({job.elapsed():.1f} s)", icon=":material/hourglass_top:")
+    with button_col:
+        if st.button(":material/cancel: Annuler", type="tertiary", key="cancel-solve-job"):
+            job.cancel()
+            st.session_state.solve_job = None
+            st.rerun(scope="app")
 
 
 def display_solution():
     """Display the solution and plot if available."""
-    solution = st.session_state.solution
+    solution = get_stored("solution")
 
     if solution is not None:
         st.header(":material/lightbulb: Solution")
@@ -267,7 +388,7 @@ def display_solution():
             use_system_display = not use_system_display
 
         if isinstance(solution, str):
-            show_error(solution, "st.session_state.solution is str", "display_solution")
+            show_error(solution, "stored solution is str", "display_solution")
 
         elif solution is None or solution == []:
             st.warning("Aucune solution n'a été trouvée, l'équation est peut-être triviale (par exemple 0=0).")
@@ -283,6 +404,9 @@ def display_solution():
     else:
         st.info("Entrez une EDO et cliquez sur :red-background[:material/calculate: Résoudre] pour calculer une solution.")
 
+    if st.session_state.verification_jobs:
+        verification_jobs_progress()
+
 
 def display_system_solution(solution):
     """Display solution for a system of ODEs."""
@@ -299,14 +423,16 @@ def display_system_solution(solution):
             for j, sol in enumerate(sol_set):
                 empty_col, latex_col, action_col = st.columns([1, 8, 1], vertical_alignment="bottom")
 
-                try:
-                    latex_col.latex(sympy.latex(sol))
-                except Exception as e:
-                    latex_col.warning(f"Échec du rendu LaTeX : {e}")
-                    latex_col.text(str(sol))
+                if not render_latex(latex_col, sol):
+                    continue
+
+                if j == 0:
+                    render_verification_badge(empty_col, sol_set)
 
                 with action_col.popover(":material/line_axis:"):
                     st.link_button("Ouvrir dans Geogebra", generate_geogebra_url(sol.rhs), type="tertiary")
+                    if st.button("Vérifier symboliquement", type="tertiary", key=f"symbolic-check-{i}-{j}"):
+                        check_symbolically(sol_set)
                     if st.button("Copier LaTeX", type="tertiary", key=f"latex-copy-{i}-{j}"):
                         pyperclip.copy(sympy.latex(sol))
                     if st.button("Copier texte", type="tertiary", key=f"text-copy-{i}-{j}"):
@@ -328,15 +454,18 @@ def display_solutions(solutions):
 
         empty_col, latex_col, action_col = st.columns([1, 8, 1], vertical_alignment="bottom")
 
-        try:
-            latex_col.latex(sympy.latex(solution))
-        except Exception as e:
-            latex_col.warning(f"Échec du rendu LaTeX : {e}")
-            latex_col.text(str(solution))
+        if not render_latex(latex_col, solution):
+            if solution_to_study is solution:
+                solution_to_study = None
+            continue
+
+        render_verification_badge(empty_col, [solution])
 
         with action_col.popover(":material/line_axis:" if multiple_solutions else ":material/content_copy:"):
             if multiple_solutions and st.button("Tracer ou dériver", type="tertiary", key=f"study-{i}"):
                 solution_to_study = solution
+            if st.button("Vérifier symboliquement", type="tertiary", key=f"symbolic-check-{i}"):
+                check_symbolically([solution])
             if st.button("Copier LaTeX", type="tertiary", key=f"latex-copy-{i}"):
                 pyperclip.copy(sympy.latex(solution))
             if st.button("Copier texte", type="tertiary", key=f"text-copy-{i}"):
@@ -381,7 +510,8 @@ def study_sol(solution_to_study):
 
         st.session_state.current_plot_range = (left_range, right_range)
 
-        fig, _, error = create_solution_plot(sol_rhs, x_sym, st.session_state.current_plot_range, constants_values=constants_values)
+        fig, _, error = create_solution_plot(sol_rhs, x_sym, st.session_state.current_plot_range, constants_values=constants_values,
+                                             evaluate=series_evaluator(solution_to_study, constants_values))
         if fig:
             st.pyplot(fig)
         elif error:
@@ -406,7 +536,8 @@ def study_sol(solution_to_study):
         st.session_state.current_plot_range = (left_range, right_range)
 
         # Normal plot with no constants
-        fig, _, error = create_solution_plot(sol_rhs, x_sym, st.session_state.current_plot_range)
+        fig, _, error = create_solution_plot(sol_rhs, x_sym, st.session_state.current_plot_range,
+                                             evaluate=series_evaluator(solution_to_study))
         if fig:
             st.pyplot(fig)
         elif error:
@@ -424,8 +555,14 @@ def study_sol(solution_to_study):
     for order in range(1, higher_derivative + 1):
         empty_col, latex_col, action_col = st.columns([1, 8, 1], vertical_alignment="bottom")
 
-        derivative = compute_nth_derivative(solution_to_study, order)
-        latex_col.latex(sympy.latex(derivative))
+        try:
+            derivative = compute_nth_derivative(solution_to_study, order)
+        except ResourceLimitError as e:
+            latex_col.warning(str(e))
+            break
+        if not render_latex(latex_col, derivative):
+            # Higher derivatives are only larger
+            break
 
         with action_col.popover(":material/content_copy:"):
             if st.button("Copier LaTeX", type="tertiary", key=f"latex-copy-{order}"):
@@ -434,6 +571,152 @@ def study_sol(solution_to_study):
                 pyperclip.copy(str(derivative).replace('**', '^'))
 
 
+def render_verification_badge(container, solutions):
+    """Render a badge telling whether the solutions satisfy the solved equations, checked numerically.
+
+    The check runs in a background job, the badge shows an hourglass until it is over.
+    """
+    ode_eqs = get_stored("solved_equations")
+    if not ode_eqs:
+        return
+
+    series_solution = get_stored("series_solution")
+    if series_solution is not None and list(solutions) == [series_solution.equation]:
+        # A truncated series only holds near x0
+        outcome = verification_outcome(verify_series_solution, tuple(ode_eqs), tuple(solutions), series_solution.x0,
+                                       len(series_solution.coefficients) - 1)
+        interval = f"autour de x₀ (± {SERIES_CHECK_RADIUS})"
+    else:
+        outcome = verification_outcome(verify_solution, tuple(ode_eqs), tuple(solutions),
+                                       tuple(st.session_state.current_plot_range))
+        interval = "de l'intervalle tracé"
+
+    if outcome is None:
+        container.markdown(":gray-badge[:material/hourglass_top:]", help="Vérification en cours...")
+        return
+
+    verification, reason = outcome
+    if verification.status == "unknown":
+        container.markdown(":gray-badge[:material/help: ?]", help=reason)
+        return
+
+    details = (f"Résidu maximal {verification.max_residual:.2e}, relatif {verification.relative_residual:.2e}, "
+               f"sur {verification.points} points {interval}.")
+    if verification.status == "verified":
+        container.markdown(":green-badge[:material/check: Vérifiée]", help=details)
+    elif verification.status == "approximate":
+        container.markdown(":orange-badge[:material/check: Approchée]", help=details)
+    else:
+        container.markdown(":red-badge[:material/close: Fausse]", help=details)
+
+
+def verification_outcome(verify, *args):
+    """(Verification, reason) of verify(*args), None while its job is running.
+
+    Outcomes are cached by the content hashes of the arguments, shared by all sessions.
+    """
+    key = (verify.__name__, *(content_hash(arg) for arg in args))
+    outcome = cached_verification(key)
+    if outcome is not None:
+        return outcome
+
+    jobs = st.session_state.verification_jobs
+    if key not in jobs:
+        jobs[key] = SolveJob(verify, *args, label="Vérification...", timeout=VERIFICATION_JOB_SECONDS)
+        kill_on_eviction("verification_jobs", jobs.values())
+        return None
+    if not jobs[key].poll():
+        return None
+    return collect_verification_job(key)
+
+
+def collect_verification_job(key):
+    """Cache the outcome of a finished verification job and forget the job."""
+    verification, reason = st.session_state.verification_jobs.pop(key).result()
+    if verification is None:
+        # The job crashed or ran out of time
+        verification = Verification("unknown", None, None, 0)
+    cache_verification(key, (verification, reason))
+    return verification, reason
+
+
+@st.fragment(run_every=0.5)
+def verification_jobs_progress():
+    """Poll the running verification jobs, and rerun the page to show their badges once they are over."""
+    finished = [key for key, job in st.session_state.verification_jobs.items() if job.poll()]
+    for key in finished:
+        collect_verification_job(key)
+    if finished:
+        st.rerun(scope="app")
+
+
+def check_symbolically(solutions):
+    """Check the solutions with sympy's checkodesol in a background job, slower than the numeric verification."""
+    if st.session_state.symbolic_check_job is not None:
+        st.session_state.symbolic_check_job.cancel()
+    job = SolveJob(check_solution_symbolically, tuple(get_stored("solved_equations") or ()), tuple(solutions),
+                   label="Vérification symbolique...")
+    st.session_state.symbolic_check_job = job
+    kill_on_eviction("symbolic_check_job", [job])
+    st.rerun()
+
+
+@st.fragment(run_every=0.5)
+def symbolic_check_progress():
+    """Poll the running symbolic check, and report its result once it is over."""
+    job = st.session_state.symbolic_check_job
+    if job is None:
+        return
+
+    if job.poll():
+        st.session_state.symbolic_check_job = None
+        verified, error = job.result()
+        if error:
+            st.toast(error, icon=":material/help:")
+        elif verified:
+            st.toast("La solution vérifie l'équation.", icon=":material/check:")
+        else:
+            st.toast("SymPy n'a pas pu montrer que la solution vérifie l'équation.", icon=":material/close:")
+        return
+
+    status_col, button_col = st.columns([8, 1], vertical_alignment="center")
+    with status_col:
+        st.info(f"{job.label} ({job.elapsed():.1f} s)", icon=":material/hourglass_top:")
+    with button_col:
+        if st.button(":material/cancel: Annuler", type="tertiary", key="cancel-symbolic-check"):
+            job.cancel()
+            st.session_state.symbolic_check_job = None
+            st.rerun(scope="app")
+
+
+def render_session_metrics():
+    """Render the memory footprint of the session's stored objects, when the page is opened with ?stats."""
+    if "stats" not in st.query_params:
+        return
+
+    with st.sidebar.expander("Mémoire de la session"):
+        st.json({
+            "session": session_store.session_footprint(st.session_state.session_id),
+            "serveur": session_store.stats(),
+        })
+
+
+def render_latex(container, expr):
+    """Render expr as LaTeX in container, returns False if it is too large to be rendered."""
+    try:
+        check_expression_size(expr)
+    except ResourceLimitError as e:
+        container.warning(str(e))
+        return False
+
+    try:
+        container.latex(sympy.latex(expr))
+    except Exception as e:
+        container.warning(f"Échec du rendu LaTeX : {e}")
+        container.text(str(expr))
+    return True
+
+
 def show_intructions():
     st.markdown(r"""
         ### :material/info: Instructions :
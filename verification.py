@@ -0,0 +1,218 @@
+"""Checks that a solution returned by the solver actually satisfies its ODE.
+
+The fast check is numeric: the solution and its derivatives are lambdified and
+substituted into both sides of the equation on a random grid, in one vectorized
+pass. Constants (C1, C2...) and parameters get random values, as a solution must
+hold for all of them. sympy's checkodesol is only used on request, as it is
+often slower than the solve itself.
+
+A single diff or lambdify call can't be interrupted, the interface runs both
+checks in solve jobs (see jobs.py) and keeps the outcomes of the numeric one in
+a cache shared by all sessions, keyed by the content hashes of the equations
+and solutions.
+"""
+import collections
+import threading
+import time
+
+import numpy as np
+import sympy
+from sympy import Derivative, Symbol, lambdify
+from sympy.core.function import AppliedUndef
+
+from calc import x_sym, get_ode_order
+from limits import ResourceLimitError, check_expression_size
+
+# Relative residuals under which a solution is considered exact, or a good approximation
+VERIFIED_TOLERANCE = 1e-8
+APPROXIMATE_TOLERANCE = 1e-4
+
+# Truncated series only hold near their expansion point, they are checked on x0 ± SERIES_CHECK_RADIUS
+SERIES_CHECK_RADIUS = 0.1
+# Margin over the truncation error radius^(order - ode order + 1) expected from a correct series
+SERIES_TRUNCATION_MARGIN = 10
+
+# Time spent on a numeric verification, and wall-clock time of a verification job including the start of its process
+VERIFICATION_TIME_BUDGET = 5.0
+VERIFICATION_JOB_SECONDS = 15
+
+# Number of verification outcomes kept, across all sessions
+VERIFICATION_CACHE_SIZE = 256
+
+Verification = collections.namedtuple("Verification", ["status", "max_residual", "relative_residual", "points"])
+Verification.__doc__ = """Outcome of a numeric verification.
+
+status              "verified", "approximate", "failed", or "unknown" when it could not be checked
+max_residual        largest |lhs - rhs| on the grid
+relative_residual   largest |lhs - rhs| / (sum of |terms| of both sides) on the grid
+points              number of grid points where both sides could be evaluated
+"""
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+_verification_cache = collections.OrderedDict()
+_verification_cache_lock = threading.Lock()
+
+
+def cached_verification(key):
+    """(Verification, reason) stored under key, None if it was never computed or was dropped."""
+    with _verification_cache_lock:
+        outcome = _verification_cache.get(key)
+        if outcome is not None:
+            _verification_cache.move_to_end(key)
+        return outcome
+
+
+def cache_verification(key, outcome):
+    """Keep a (Verification, reason) outcome, key must only hold hashes and numbers, not sympy objects."""
+    with _verification_cache_lock:
+        _verification_cache[key] = outcome
+        _verification_cache.move_to_end(key)
+        while len(_verification_cache) > VERIFICATION_CACHE_SIZE:
+            _verification_cache.popitem(last=False)
+
+
+def _unknown(reason):
+    return Verification("unknown", None, None, 0), reason
+
+
+def verify_solution(ode_eqs, solutions, x_range=(-5, 5), num_points=200, time_budget=VERIFICATION_TIME_BUDGET):
+    """Numerically check that solutions (tuple of Eq(f(x), ...)) satisfy ode_eqs (tuple of Eq).
+
+    Returns (Verification, reason), reason explains an "unknown" status. Stops
+    with an "unknown" status once time_budget seconds are spent, which is only
+    checked between steps.
+    """
+    started_at = time.perf_counter()
+
+    def check_budget():
+        if time.perf_counter() - started_at > time_budget:
+            raise _BudgetExceeded()
+
+    try:
+        return _verify(ode_eqs, solutions, x_range, num_points, check_budget)
+    except _BudgetExceeded:
+        return _unknown(f"La vérification a dépassé le temps imparti ({time_budget} s).")
+    except ResourceLimitError as e:
+        return _unknown(str(e))
+    except Exception as e:
+        return _unknown(f"La vérification a échoué ({e}).")
+
+
+def verify_series_solution(ode_eqs, solutions, x0, order, radius=SERIES_CHECK_RADIUS):
+    """Numerically check a truncated series solution of degree order around its expansion point x0.
+
+    A truncated series never satisfies the ODE exactly: its status is "approximate" when the
+    residual is within the expected truncation error, and "unknown" otherwise, as a correct
+    series may converge slowly. It is never "failed".
+    """
+    if not sympy.sympify(x0).is_number:
+        return _unknown("Le point initial de la série n'est pas numérique.")
+    x0 = float(x0)
+    verification, reason = verify_solution(ode_eqs, solutions, (x0 - radius, x0 + radius))
+    if verification.status == "unknown":
+        return verification, reason
+
+    ode_order = max(get_ode_order(eq, sol.lhs) for eq in ode_eqs for sol in solutions)
+    tolerance = SERIES_TRUNCATION_MARGIN * radius ** max(order - ode_order + 1, 0)
+    if verification.relative_residual <= tolerance:
+        return verification._replace(status="approximate"), ""
+    return verification._replace(status="unknown"), (
+        f"Le résidu relatif ({verification.relative_residual:.2e}) dépasse l'erreur de troncature attendue "
+        f"({tolerance:.2e}), la série converge peut-être lentement autour de x₀.")
+
+
+def _verify(ode_eqs, solutions, x_range, num_points, check_budget):
+    for sol in solutions:
+        if not isinstance(sol.lhs, AppliedUndef):
+            return _unknown("Les solutions implicites ne peuvent pas être vérifiées numériquement.")
+    if len({sol.lhs for sol in solutions}) != len(solutions):
+        raise ValueError("une seule solution par fonction doit être vérifiée à la fois")
+
+    # Symbols standing for each function and its derivatives in the equations
+    derivative_symbols = {}
+    derivative_exprs = []
+    for sol in solutions:
+        func = sol.lhs
+        order = max(get_ode_order(eq, func) for eq in ode_eqs)
+        check_expression_size(sol.rhs)
+        expr = sol.rhs
+        for k in range(order + 1):
+            if k:
+                expr = sympy.diff(expr, x_sym)
+                check_expression_size(expr)
+                check_budget()
+            derivative_symbols[(func, k)] = Symbol(f"_{func.func}_{k}")
+            derivative_exprs.append(expr)
+
+    residuals, scales = [], []
+    for eq in ode_eqs:
+        sides = []
+        for side in (eq.lhs, eq.rhs):
+            # Highest derivatives first, so that f(x) is not replaced inside them
+            for (func, k), symbol in sorted(derivative_symbols.items(), key=lambda item: -item[0][1]):
+                side = side.subs(Derivative(func, (x_sym, k)) if k else func, symbol)
+            sides.append(side)
+        residuals.append(sides[0] - sides[1])
+        # Magnitude of the terms rather than of the sides, which already cancel in "expr = 0" equations
+        scales.append(sympy.Add(*[sympy.Abs(term) for side in sides for term in sympy.Add.make_args(side)]))
+
+    # Random values for the constants and parameters, the solution must hold for any of them
+    rng = np.random.default_rng(0)
+    free_symbols = set().union(*(expr.free_symbols for expr in derivative_exprs + residuals)) - {x_sym}
+    free_symbols -= set(derivative_symbols.values())
+    parameter_values = {s: float(rng.uniform(0.5, 1.5)) for s in sorted(free_symbols, key=str)}
+
+    derivative_exprs = [expr.subs(parameter_values) for expr in derivative_exprs]
+    residuals = [expr.subs(parameter_values) for expr in residuals]
+    scales = [expr.subs(parameter_values) for expr in scales]
+    check_budget()
+
+    modules = ['numpy', {'Heaviside': lambda x: np.heaviside(x, 0.5)}]
+    solution_func = lambdify(x_sym, derivative_exprs, modules=modules)
+    residual_func = lambdify([x_sym, *derivative_symbols.values()], residuals + scales, modules=modules)
+    check_budget()
+
+    x_vals = np.sort(rng.uniform(x_range[0], x_range[1], num_points))
+    with np.errstate(all="ignore"):
+        derivative_vals = [np.broadcast_to(np.asarray(v, dtype=complex), x_vals.shape)
+                           for v in solution_func(x_vals)]
+        outputs = [np.broadcast_to(np.asarray(v, dtype=complex), x_vals.shape)
+                   for v in residual_func(x_vals, *derivative_vals)]
+
+        residual_vals = np.abs(np.array(outputs[:len(residuals)]))
+        scale_vals = np.abs(np.array(outputs[len(residuals):]))
+        finite = np.isfinite(residual_vals).all(axis=0) & np.isfinite(scale_vals).all(axis=0)
+        if not finite.any():
+            return _unknown("La solution n'a pas pu être évaluée sur l'intervalle.")
+
+        residual_vals = residual_vals[:, finite]
+        relative_vals = residual_vals / np.maximum(scale_vals[:, finite], np.finfo(float).tiny)
+
+    max_residual = float(residual_vals.max())
+    relative_residual = float(relative_vals.max())
+    if relative_residual <= VERIFIED_TOLERANCE:
+        status = "verified"
+    elif relative_residual <= APPROXIMATE_TOLERANCE:
+        status = "approximate"
+    else:
+        status = "failed"
+    return Verification(status, max_residual, relative_residual, int(finite.sum())), ""
+
+
+def check_solution_symbolically(ode_eqs, solutions):
+    """Check solutions with sympy's checkodesol, returns (True/False, error)."""
+    try:
+        if len(ode_eqs) == 1:
+            funcs = [sol.lhs for sol in solutions]
+            results = [sympy.checkodesol(ode_eqs[0], sol, func=func)[0] for sol, func in zip(solutions, funcs)]
+        else:
+            results = [sympy.checkodesol(list(ode_eqs), list(solutions))[0]]
+        return all(results), ""
+    except NotImplementedError:
+        return None, "La vérification symbolique n'est pas supportée pour cette équation."
+    except Exception as e:
+        return None, f"La vérification symbolique a échoué ({e})."